@@ -1,22 +1,34 @@
+import html
+from contextlib import aclosing
+
 from aiogram import Router, F
 from aiogram.filters import CommandStart
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
-router = Router()
-
-from app.bot.keyboards.main_menu import main_menu_keyboard, dynamic_keyboard
-from app.services.ai import get_service_data_from_text
+from app.bot.keyboards.main_menu import BACK_BUTTON_TEXT, main_menu_keyboard, dynamic_keyboard, is_submenu_button
+from app.bot.progress import ProgressMessage
+from app.core.config import settings
+from app.services.ai import stream_service_data_from_text
 from app.services.crud import create_service
+from app.web.schemas import ServiceData
 from sqlalchemy.ext.asyncio import AsyncSession
-import asyncio
+
+SERVICE_FIELD_LABELS = {
+    "name": "Назва",
+    "category": "Категорія",
+    "address": "Адреса",
+    "phone": "Телефон",
+    "schedule": "Графік роботи",
+    "social_media": "Соцмережі",
+    "description": "Опис",
+}
 
 class AdminContact(StatesGroup):
     waiting_for_message = State()
     waiting_for_service_details = State()
 
-@router.message(CommandStart())
 async def cmd_start(message: Message, session: AsyncSession):
     """
     This handler receives messages with `/start` command
@@ -28,33 +40,27 @@ async def cmd_start(message: Message, session: AsyncSession):
     )
     await message.answer(welcome_text, reply_markup=await main_menu_keyboard(session))
 
-@router.message(F.text)
+async def is_menu_navigation(message: Message, session: AsyncSession) -> bool:
+    return message.text == BACK_BUTTON_TEXT or await is_submenu_button(session, message.text)
+
+# Only navigation buttons are handled here; any other text falls through to the
+# contact, category and search handlers
 async def handle_dynamic_buttons(message: Message, session: AsyncSession):
     """
     Handles all dynamic buttons.
     """
-    if message.text == "⬅️ Назад":
+    if message.text == BACK_BUTTON_TEXT:
         await message.answer("Головне меню", reply_markup=await main_menu_keyboard(session))
         return
 
     keyboard = await dynamic_keyboard(session, message.text)
-    
-    # If the keyboard has more than just a "Back" button, it's a submenu
-    if len(keyboard.keyboard) > 1:
-        await message.answer(f"Розділ: {message.text}", reply_markup=keyboard)
-    else:
-        # Otherwise, it's a leaf node, so we can treat it as a category
-        # This is a simplification. For a real app, you'd have a more robust way
-        # to distinguish between submenus and action buttons.
-        await message.answer(f"Тут будуть послуги для категорії '{message.text}'")
-
-@router.message(F.text.in_({"❓ Питання", "💡 Пропозиція", "😡 Скарга", "🤝 Співпраця"}))
+    await message.answer(f"Розділ: {message.text}", reply_markup=keyboard)
+
 async def handle_admin_contact(message: Message, state: FSMContext):
     await state.update_data(contact_type=message.text)
     await message.answer("Будь ласка, напишіть ваше повідомлення і я передам його адміністратору.")
     await state.set_state(AdminContact.waiting_for_message)
 
-@router.message(AdminContact.waiting_for_message)
 async def process_admin_message(message: Message, state: FSMContext):
     # Here you would typically forward the message to the admin.
     # For now, we'll just confirm receipt.
@@ -68,17 +74,30 @@ async def process_admin_message(message: Message, state: FSMContext):
     await message.answer("Дякую, ваше повідомлення було відправлено адміністратору.")
     await state.clear()
 
-@router.message(F.text == "➕ Додати свою послугу")
 async def add_own_service(message: Message, state: FSMContext):
     await message.answer("Будь ласка, надішліть детальну інформацію про вашу послугу в одному повідомленні. Наприклад:\n\nНазва: Шиномонтаж 'У Петровича'\nКатегорія: Автомобільний сервіс\nАдреса: вул. Центральна, 10\nТелефон: 0991234567\nГрафік роботи: Пн-Сб 9:00-18:00")
     await state.set_state(AdminContact.waiting_for_service_details)
 
-@router.message(AdminContact.waiting_for_service_details)
 async def process_service_details(message: Message, state: FSMContext, session: AsyncSession):
-    await message.answer("Обробляю інформацію...")
-    
-    service_data = await asyncio.to_thread(get_service_data_from_text, message.text)
-    
+    placeholder_text = "Обробляю інформацію..."
+    progress = ProgressMessage(await message.answer(placeholder_text), settings.BOT_PROGRESS_EDIT_INTERVAL)
+
+    # Show the fields as the AI extracts them
+    fields: dict = {}
+    try:
+        async with aclosing(stream_service_data_from_text(message.text)) as stream:
+            async for fields in stream:
+                lines = [
+                    f"{label}: {html.escape(str(fields[key]))}"
+                    for key, label in SERVICE_FIELD_LABELS.items()
+                    if fields.get(key)
+                ]
+                await progress.update("\n".join([placeholder_text, ""] + lines))
+        service_data = ServiceData(**fields)
+    except Exception:
+        # A stream that broke off leaves only part of the listing, which must not be saved
+        service_data = None
+
     if not service_data:
         await message.answer("Вибачте, не вдалося обробити інформацію. Будь ласка, спробуйте ще раз, дотримуючись формату.")
         return
@@ -86,4 +105,15 @@ async def process_service_details(message: Message, state: FSMContext, session:
     await create_service(session, service_data.model_dump())
     
     await message.answer("Дякую! Ваша послуга була додана і після перевірки з'явиться в боті.")
-    await state.clear()
\ No newline at end of file
+    await state.clear()
+
+
+def create_router() -> Router:
+    router = Router()
+    router.message.register(cmd_start, CommandStart())
+    router.message.register(handle_dynamic_buttons, F.text, is_menu_navigation)
+    router.message.register(handle_admin_contact, F.text.in_({"❓ Питання", "💡 Пропозиція", "😡 Скарга", "🤝 Співпраця"}))
+    router.message.register(process_admin_message, AdminContact.waiting_for_message)
+    router.message.register(add_own_service, F.text == "➕ Додати свою послугу")
+    router.message.register(process_service_details, AdminContact.waiting_for_service_details)
+    return router
@@ -0,0 +1,97 @@
+from aiogram import Router, F
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from aiogram.types import (
+    Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.services.crud import get_nearby_services
+from app.services.category_registry import category_registry
+from app.bot.keyboards.callbacks import ServiceCallback, NearbyCallback
+
+async def ask_location(message: Message):
+    keyboard = ReplyKeyboardMarkup(
+        keyboard=[
+            [KeyboardButton(text="📍 Надіслати моє місцезнаходження", request_location=True)],
+            [KeyboardButton(text="⬅️ Назад")],
+        ],
+        resize_keyboard=True,
+    )
+    await message.answer("Поділіться своїм місцезнаходженням, і я покажу найближчі послуги.", reply_markup=keyboard)
+
+
+async def handle_location(message: Message, session: AsyncSession, state: FSMContext):
+    """
+    This handler will be called when user shares their location.
+    """
+    await state.update_data(latitude=message.location.latitude, longitude=message.location.longitude)
+    response_text, keyboard = await render_nearby_services(
+        session, message.location.latitude, message.location.longitude, category_id=0
+    )
+    await message.answer(response_text, reply_markup=keyboard)
+
+
+async def handle_nearby_category(query: CallbackQuery, callback_data: NearbyCallback, session: AsyncSession, state: FSMContext):
+    data = await state.get_data()
+    if "latitude" not in data:
+        await query.answer("Надішліть своє місцезнаходження ще раз.", show_alert=True)
+        return
+
+    await query.answer()
+    response_text, keyboard = await render_nearby_services(
+        session, data["latitude"], data["longitude"], callback_data.category_id
+    )
+    await query.message.edit_text(response_text, reply_markup=keyboard)
+
+
+def _format_distance(meters: float) -> str:
+    if meters < 1000:
+        return f"{round(meters / 10) * 10:.0f} м"
+    return f"{meters / 1000:.1f} км"
+
+
+async def render_nearby_services(
+    session: AsyncSession, latitude: float, longitude: float, category_id: int
+) -> tuple[str, InlineKeyboardMarkup]:
+    nearby = await get_nearby_services(
+        session, latitude, longitude, settings.NEARBY_RESULTS_LIMIT, category_id or None
+    )
+
+    if nearby:
+        response_text = "<b>Найближчі послуги:</b>\n\n"
+    else:
+        response_text = "🤷 Поруч не знайдено жодної послуги."
+    rows = []
+    for number, (service, distance) in enumerate(nearby, start=1):
+        response_text += f"{number}. <b>{service.name}</b> — {_format_distance(distance)}\n"
+        if service.address:
+            response_text += f"📍 {service.address}\n"
+        response_text += "\n"
+        rows.append([InlineKeyboardButton(
+            text=f"ℹ️ {number}. {service.name}"[:64],
+            callback_data=ServiceCallback(action="details", service_id=service.id).pack(),
+        )])
+
+    # Category filter
+    categories = await category_registry.get_all(session)
+    filters = [("Усі", 0), *sorted(categories.items())]
+    for index in range(0, len(filters), 2):
+        rows.append([
+            InlineKeyboardButton(
+                text=f"✅ {name}" if filter_id == category_id else name,
+                callback_data=NearbyCallback(category_id=filter_id).pack(),
+            )
+            for name, filter_id in filters[index:index + 2]
+        ])
+
+    return response_text, InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def create_router() -> Router:
+    router = Router()
+    router.message.register(ask_location, Command("nearby"))
+    router.message.register(handle_location, F.location)
+    router.callback_query.register(handle_nearby_category, NearbyCallback.filter())
+    return router
@@ -1,14 +1,26 @@
-import asyncio
+import html
 import io
+import secrets
+from contextlib import aclosing
+from typing import Optional
+from math import ceil
 from aiogram import Router, F, Bot
-from aiogram.types import Message
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.services.crud import search_services
-from app.services.ai import get_search_query_from_text, translate_to_ukrainian, recognize_speech_from_bytes
-from app.bot.handlers.category import show_service_details
+from app.core.config import settings
+from app.services.crud import search_services, is_known_name
+from app.services.ai import stream_normalize_search_query, is_plain_ukrainian_query
+from app.services.speech import recognize_speech
+from app.services.embeddings import semantic_search_services
+from app.web.schemas import SearchQuery
+from app.bot.keyboards.callbacks import ServiceCallback, SearchPaginationCallback
+from app.bot.progress import ProgressMessage
 
-router = Router()
+SEARCH_RESULTS_PER_PAGE = 5
+# Result sets kept per user, so only the latest few result messages can still be paged
+SEARCH_RESULT_SETS_KEPT = 5
 
 # We need to exclude category names from the search handler
 # to avoid conflicts with the category handler.
@@ -19,8 +31,7 @@ CATEGORY_NAMES = [
     "🚌 Розклад транспорту"
 ]
 
-@router.message(F.voice)
-async def handle_voice_message(message: Message, session: AsyncSession, bot: Bot):
+async def handle_voice_message(message: Message, session: AsyncSession, bot: Bot, state: FSMContext):
     """
     This handler will be called for any voice message.
     It downloads the voice message, converts it to text, and then uses the search logic.
@@ -31,50 +42,147 @@ async def handle_voice_message(message: Message, session: AsyncSession, bot: Bot
     voice_ogg = io.BytesIO()
     await bot.download_file(voice_file.file_path, voice_ogg)
     
-    # Recognize speech in a separate thread
-    recognized_text = await asyncio.to_thread(recognize_speech_from_bytes, voice_ogg.getvalue())
+    recognized_text = await recognize_speech(voice_ogg.getvalue())
 
     if not recognized_text:
         await message.answer("Вибачте, не вдалося розпізнати ваше повідомлення. Спробуйте ще раз.")
         return
     
-    await message.answer(f"Ви сказали: \"{recognized_text}\". Шукаю...")
-    
-    await _process_search_query(message, session, bot, recognized_text)
+    placeholder = await message.answer(f"Ви сказали: \"{recognized_text}\". Шукаю...")
+    progress = ProgressMessage(placeholder, settings.BOT_PROGRESS_EDIT_INTERVAL)
+
+    await _process_search_query(message, session, state, recognized_text, progress)
 
 
-@router.message(F.text, ~F.text.in_(CATEGORY_NAMES))
-async def handle_search_query(message: Message, session: AsyncSession, bot: Bot):
+async def handle_search_query(message: Message, session: AsyncSession, state: FSMContext):
     """
     This handler will be called for any text message that is not a category button.
     It uses AI to get search keywords and then searches the database.
     """
-    await message.answer("🔎 Хвилинку, шукаю за вашим запитом...")
-    await _process_search_query(message, session, bot, message.text)
+    placeholder = await message.answer("🔎 Хвилинку, шукаю за вашим запитом...")
+    progress = ProgressMessage(placeholder, settings.BOT_PROGRESS_EDIT_INTERVAL)
+    await _process_search_query(message, session, state, message.text, progress)
 
 
-async def _process_search_query(message: Message, session: AsyncSession, bot: Bot, text: str):
-    # Translate the message to Ukrainian in a separate thread to avoid blocking
-    ukrainian_text = await asyncio.to_thread(translate_to_ukrainian, text)
-
-    # Get search query from the translated text in a separate thread
-    search_query = await asyncio.to_thread(get_search_query_from_text, ukrainian_text)
+async def _get_search_query(session: AsyncSession, text: str, progress: ProgressMessage) -> Optional[str]:
+    """
+    Turns the user's text into search keywords, skipping the LLM when the text can be searched as is.
+    """
+    text = text.strip()
+    if is_plain_ukrainian_query(text) or await is_known_name(session, text):
+        return text
+
+    # Do not hold a pooled connection during the LLM round trip
+    await session.close()
+
+    # Translate to Ukrainian and extract keywords in one round trip, showing them as they arrive
+    fields: dict = {}
+    try:
+        async with aclosing(stream_normalize_search_query(text)) as stream:
+            async for fields in stream:
+                if fields.get("keywords"):
+                    await progress.update(f"🔎 Шукаю: {html.escape(', '.join(fields['keywords']))}...")
+                elif fields.get("text"):
+                    await progress.update(f"🔎 Шукаю «{html.escape(fields['text'])}»...")
+        normalized = SearchQuery(**fields)
+    except Exception:
+        # Do not search with the keywords of a stream that broke off
+        return None
+    if not normalized.keywords:
+        return None
+    return " ".join(normalized.keywords)
+
+
+async def _process_search_query(
+    message: Message,
+    session: AsyncSession,
+    state: FSMContext,
+    text: str,
+    progress: ProgressMessage,
+):
+    services = None
+    if settings.SEMANTIC_SEARCH:
+        # Embeddings match by meaning in any language, so no LLM keyword extraction is needed.
+        # The connection is not held while the query is embedded.
+        await session.close()
+        search_query = html.escape(text.strip())
+        services = await semantic_search_services(session, text.strip())
+
+    # Also fall back when nothing was found, e.g. while the services are not embedded yet
+    if not services:
+        search_query = await _get_search_query(session, text, progress)
 
-    if not search_query:
-        await message.answer("Вибачте, не вдалося обробити ваш запит. Спробуйте перефразувати.")
-        return
+        if not search_query:
+            await message.answer("Вибачте, не вдалося обробити ваш запит. Спробуйте перефразувати.")
+            return
 
-    services = await search_services(session, search_query)
+        services = await search_services(session, search_query)
 
     if not services:
         await message.answer(f"🤷 На жаль, за запитом '{search_query}' нічого не знайдено. Спробуйте інший запит.")
         return
 
-    await message.answer(f"<b>Знайдено за запитом '{search_query}':</b>")
+    # Keep what the result pages need in the FSM data, so page flips need no queries
+    results = [{"id": service.id, "name": service.name, "address": service.address} for service in services]
+    token = secrets.token_hex(4)
+    result_sets = dict((await state.get_data()).get("search_results") or {})
+    result_sets[token] = {"query": search_query, "results": results}
+    # Dicts keep insertion order, so the oldest sets come first
+    result_sets = dict(list(result_sets.items())[-SEARCH_RESULT_SETS_KEPT:])
+    await state.update_data(search_results=result_sets)
+
+    response_text, keyboard = render_search_results(token, search_query, results, page=1)
+    await message.answer(response_text, reply_markup=keyboard)
 
-    for service in services:
-        # We can reuse the function from the category handler to display the service details
-        # by creating a "fake" message with the command.
-        fake_message = message
-        fake_message.text = f"/service_{service.id}"
-        await show_service_details(fake_message, session, bot)
\ No newline at end of file
+
+async def handle_search_pagination(query: CallbackQuery, callback_data: SearchPaginationCallback, state: FSMContext):
+    result_sets = (await state.get_data()).get("search_results") or {}
+    result_set = result_sets.get(callback_data.token) if isinstance(result_sets, dict) else None
+    if not result_set:
+        await query.answer("Результати пошуку застаріли. Надішліть запит ще раз.", show_alert=True)
+        return
+
+    await query.answer()
+    response_text, keyboard = render_search_results(callback_data.token, result_set["query"], result_set["results"], callback_data.page)
+    await query.message.edit_text(response_text, reply_markup=keyboard)
+
+
+def render_search_results(token: str, search_query: str, results: list[dict], page: int) -> tuple[str, InlineKeyboardMarkup]:
+    """
+    Renders one page of already ranked search results as a single message with a details button per result.
+    """
+    total_pages = ceil(len(results) / SEARCH_RESULTS_PER_PAGE)
+    page = min(max(page, 1), total_pages)
+    start_index = (page - 1) * SEARCH_RESULTS_PER_PAGE
+    page_results = results[start_index:start_index + SEARCH_RESULTS_PER_PAGE]
+
+    response_text = f"<b>Знайдено за запитом '{search_query}' (Сторінка {page}/{total_pages}):</b>\n\n"
+    rows = []
+    for number, result in enumerate(page_results, start=start_index + 1):
+        response_text += f"{number}. <b>{result['name']}</b>\n"
+        if result["address"]:
+            response_text += f"📍 {result['address']}\n"
+        response_text += "\n"
+        rows.append([InlineKeyboardButton(
+            text=f"ℹ️ {number}. {result['name']}"[:64],
+            callback_data=ServiceCallback(action="details", service_id=result["id"]).pack(),
+        )])
+
+    # Pagination keyboard
+    buttons = []
+    if page > 1:
+        buttons.append(InlineKeyboardButton(text="⬅️ Назад", callback_data=SearchPaginationCallback(token=token, page=page-1).pack()))
+    if page < total_pages:
+        buttons.append(InlineKeyboardButton(text="Вперед ➡️", callback_data=SearchPaginationCallback(token=token, page=page+1).pack()))
+    if buttons:
+        rows.append(buttons)
+
+    return response_text, InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def create_router() -> Router:
+    router = Router()
+    router.message.register(handle_voice_message, F.voice)
+    router.message.register(handle_search_query, F.text, ~F.text.in_(CATEGORY_NAMES))
+    router.callback_query.register(handle_search_pagination, SearchPaginationCallback.filter())
+    return router
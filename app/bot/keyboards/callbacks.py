@@ -7,4 +7,13 @@ class ServiceCallback(CallbackData, prefix="service"):
 class PaginationCallback(CallbackData, prefix="pag"):
     action: str
     page: int
-    category_name: str
\ No newline at end of file
+    category_id: int
+
+class SearchPaginationCallback(CallbackData, prefix="spag"):
+    # Identifies the result set, so older result messages keep paging through their own results
+    token: str
+    page: int
+
+class NearbyCallback(CallbackData, prefix="near"):
+    # 0 means all categories
+    category_id: int
@@ -1,28 +1,85 @@
+from typing import Optional
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import invalidation
+from app.models import MenuButton
 from app.services.crud import get_all_menu_buttons
 
+BACK_BUTTON_TEXT = "⬅️ Назад"
+
+
+class MenuTree:
+    """
+    Prebuilt keyboards for the whole menu: the main menu plus a submenu keyboard per button text.
+    """
+
+    def __init__(self, buttons: list[MenuButton]):
+        buttons = sorted(buttons, key=lambda button: button.id)
+        children: dict[int, list[MenuButton]] = {}
+        for button in buttons:
+            if button.parent_id:
+                children.setdefault(button.parent_id, []).append(button)
+
+        self.back_keyboard = ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text=BACK_BUTTON_TEXT)]], resize_keyboard=True)
+        self.main_keyboard = ReplyKeyboardMarkup(
+            keyboard=[[KeyboardButton(text=button.text)] for button in buttons if not button.parent_id],
+            resize_keyboard=True,
+        )
+        self.submenus: dict[str, ReplyKeyboardMarkup] = {}
+        # Texts of the buttons that open a submenu
+        self.parents = {button.text for button in buttons if button.id in children}
+        for button in buttons:
+            # Like the linear scan this replaces, the first button with a given text wins
+            if button.text in self.submenus:
+                continue
+            rows = [[KeyboardButton(text=child.text)] for child in children.get(button.id, [])]
+            rows.append([KeyboardButton(text=BACK_BUTTON_TEXT)])
+            self.submenus[button.text] = ReplyKeyboardMarkup(keyboard=rows, resize_keyboard=True)
+
+
+_menu_tree: Optional[MenuTree] = None
+_menu_version = 0
+
+
+def invalidate_menu_cache(key: str = "") -> None:
+    global _menu_tree, _menu_version
+    _menu_tree = None
+    _menu_version += 1
+
+
+invalidation.subscribe(invalidation.MENU, invalidate_menu_cache)
+
+
+async def get_menu_tree(session: AsyncSession) -> MenuTree:
+    """
+    Returns the cached menu tree, loading it from the database after an invalidation.
+    """
+    global _menu_tree
+    if _menu_tree is None:
+        version = _menu_version
+        tree = MenuTree(await get_all_menu_buttons(session))
+        # Do not cache a tree that was invalidated while it was loading
+        if version != _menu_version:
+            return tree
+        _menu_tree = tree
+    return _menu_tree
+
+
 async def main_menu_keyboard(session: AsyncSession) -> ReplyKeyboardMarkup:
     """
     Creates the main menu keyboard from the database.
     """
-    buttons_data = await get_all_menu_buttons(session)
-    buttons = [[KeyboardButton(text=button.text)] for button in buttons_data if not button.parent_id]
-    keyboard = ReplyKeyboardMarkup(keyboard=buttons, resize_keyboard=True)
-    return keyboard
+    return (await get_menu_tree(session)).main_keyboard
+
+async def is_submenu_button(session: AsyncSession, text: str) -> bool:
+    """
+    Checks whether the text is a menu button that opens a submenu.
+    """
+    return text in (await get_menu_tree(session)).parents
 
 async def dynamic_keyboard(session: AsyncSession, parent_button_text: str) -> ReplyKeyboardMarkup:
     """
     Creates a dynamic keyboard based on the parent button.
     """
-    buttons_data = await get_all_menu_buttons(session)
-    parent_button = next((b for b in buttons_data if b.text == parent_button_text), None)
-    
-    if parent_button:
-        buttons = [[KeyboardButton(text=child.text)] for child in parent_button.children]
-        buttons.append([KeyboardButton(text="⬅️ Назад")])
-    else:
-        buttons = [[KeyboardButton(text="⬅️ Назад")]]
-        
-    keyboard = ReplyKeyboardMarkup(keyboard=buttons, resize_keyboard=True)
-    return keyboard
\ No newline at end of file
+    tree = await get_menu_tree(session)
+    return tree.submenus.get(parent_button_text, tree.back_keyboard)
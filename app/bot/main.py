@@ -1,33 +1,101 @@
 import asyncio
 import logging
+from typing import Optional
 
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.redis import RedisStorage
 
+from app.core import invalidation
 from app.core.config import settings
-from app.core.db import async_session_maker
-from app.bot.handlers import common, category, search
+from app.core.db import read_session_maker
+from app.bot.service_cards import warm_up_service_cards
+from app.bot.handlers import common, category, nearby, search
 from app.bot.middleware.db import DbSessionMiddleware
+from app.bot.middleware.metrics import HandlerMetricsMiddleware, TelegramRequestMetricsMiddleware
+from app.bot.middleware.throttling import ThrottlingMiddleware
+from app.services.geocoding_queue import geocoding_worker
+from app.services.embedding_queue import embedding_worker
 
-async def main() -> None:
-    # Initialize Bot and Dispatcher
+def create_bot(session: Optional[BaseSession] = None) -> Bot:
+    """
+    Creates a bot whose Bot API requests are timed. Pass a session that no other bot uses,
+    since the metrics middleware is registered on it.
+    """
     bot = Bot(
         token=settings.BOT_TOKEN,
+        session=session,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
-    dp = Dispatcher()
+    bot.session.middleware(TelegramRequestMetricsMiddleware())
+    return bot
+
+def create_storage() -> BaseStorage:
+    """
+    FSM storage shared by every bot process when Redis is configured, in-memory otherwise.
+    """
+    if settings.REDIS_URL:
+        return RedisStorage.from_url(settings.REDIS_URL)
+    return MemoryStorage()
+
+def create_dispatcher() -> Dispatcher:
+    dp = Dispatcher(storage=create_storage())
+
+    # Register middleware. Bot traffic is read-mostly, so reads go to the replica if one is configured.
+    dp.update.middleware(DbSessionMiddleware(session_pool=read_session_maker))
+
+    # Routers are built per dispatcher, so middlewares are never registered twice
+    # and every dispatcher (tests, webhook workers) gets its own throttling state.
+    # nearby goes first so /nearby is not taken by common's catch-all text handler.
+    routers = {module: module.create_router() for module in (nearby, common, category, search)}
+
+    # Bound the AI and speech-to-text work a single user (or everybody together) can trigger
+    routers[search].message.middleware(ThrottlingMiddleware(
+        user_rate=settings.THROTTLE_USER_RATE,
+        user_burst=settings.THROTTLE_USER_BURST,
+        global_rate=settings.THROTTLE_GLOBAL_RATE,
+        global_burst=settings.THROTTLE_GLOBAL_BURST,
+        max_in_flight=settings.THROTTLE_MAX_IN_FLIGHT,
+        supersede_timeout=settings.THROTTLE_SUPERSEDE_TIMEOUT,
+    ))
+
+    handler_metrics = HandlerMetricsMiddleware()
+    for router in routers.values():
+        # Inner middlewares are per router; registered last, so the timing covers just the handler
+        router.message.middleware(handler_metrics)
+        router.callback_query.middleware(handler_metrics)
+        dp.include_router(router)
+    return dp
+
+async def main() -> None:
+    # Initialize Bot and Dispatcher
+    bot = create_bot()
+    dp = create_dispatcher()
 
-    # Register middleware
-    dp.update.middleware(DbSessionMiddleware(session_pool=async_session_maker))
+    # Polling and webhooks are mutually exclusive
+    await bot.delete_webhook()
 
-    # Register handlers
-    dp.include_router(common.router)
-    dp.include_router(category.router)
-    dp.include_router(search.router)
+    # Geocode new and edited services in the background
+    geocoding_worker.start()
+    if settings.SEMANTIC_SEARCH:
+        embedding_worker.start()
+    # Drop cached menus when the admin panel changes them
+    invalidation_listener = asyncio.create_task(invalidation.listen())
+    if settings.SERVICE_CARD_WARMUP:
+        # In the background, so polling starts right away
+        asyncio.create_task(warm_up_service_cards(settings.SERVICE_CARD_WARMUP))
 
     # Start polling
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        invalidation_listener.cancel()
+        await geocoding_worker.stop()
+        await embedding_worker.stop()
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,48 @@
+import time
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import TelegramObject
+
+from app.core.metrics import BOT_HANDLER_DURATION, TELEGRAM_REQUEST_DURATION
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Records how long each handler takes. Registered as an inner middleware, so the handler is known.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object else "unknown"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            BOT_HANDLER_DURATION.labels(type(event).__name__, name).observe(time.perf_counter() - started)
+
+
+class TelegramRequestMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Records the latency of every Bot API request (sendMessage, editMessageText, ...).
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            TELEGRAM_REQUEST_DURATION.labels(method.__api_method__).observe(time.perf_counter() - started)
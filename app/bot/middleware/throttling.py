@@ -0,0 +1,111 @@
+import asyncio
+import time
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message
+
+from app.services.cache import TTLCache
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def consume(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Keeps expensive handlers (AI search, voice recognition) bounded per user and globally:
+
+    - a token bucket per user and one shared by everybody limit the request rate
+    - a new request cancels the same user's request that is still running, so only
+      the latest search is finished
+    - while a user has `max_in_flight` requests running, a new one first waits up to
+      `supersede_timeout` seconds for the cancelled ones to unwind
+
+    The latest request always runs: the wait only keeps cancelled requests from piling up.
+
+    State is per process. In webhook mode all updates of a chat go to the same worker,
+    which also handles them one at a time, so there only the rate limits come into play.
+    """
+
+    def __init__(
+        self,
+        user_rate: float,
+        user_burst: int,
+        global_rate: float,
+        global_burst: int,
+        max_in_flight: int,
+        supersede_timeout: float,
+    ):
+        super().__init__()
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_in_flight = max_in_flight
+        self.supersede_timeout = supersede_timeout
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        # An idle user's bucket refills completely after burst / rate seconds, so it can be dropped then
+        self.user_buckets = TTLCache(maxsize=10000, ttl=user_burst / user_rate)
+        self.running: dict[int, set[asyncio.Task]] = {}
+        self.latest: dict[int, asyncio.Task] = {}
+        self.superseded: set[asyncio.Task] = set()
+
+    def _user_bucket(self, user_id: int) -> TokenBucket:
+        bucket = self.user_buckets.get(user_id)
+        if bucket is None:
+            bucket = TokenBucket(self.user_rate, self.user_burst)
+        # Re-set on every use to keep the entry alive while the user is active
+        self.user_buckets.set(user_id, bucket)
+        return bucket
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        user_id = event.from_user.id if event.from_user else event.chat.id
+
+        if not self._user_bucket(user_id).consume() or not self.global_bucket.consume():
+            await event.answer("⏳ Забагато запитів. Будь ласка, спробуйте трохи пізніше.")
+            return None
+
+        previous = self.latest.get(user_id)
+        if previous is not None and not previous.done():
+            self.superseded.add(previous)
+            previous.cancel()
+
+        task = asyncio.current_task()
+        running = self.running.setdefault(user_id, set())
+        # Cancelled requests are still running until they have unwound, which takes at least one loop iteration
+        unwinding = set(running)
+        self.latest[user_id] = task
+        running.add(task)
+        try:
+            if len(unwinding) >= self.max_in_flight:
+                await asyncio.wait(unwinding, timeout=self.supersede_timeout)
+            return await handler(event, data)
+        except asyncio.CancelledError:
+            if task not in self.superseded:
+                raise
+            # A newer request from the same user took over
+            return None
+        finally:
+            self.superseded.discard(task)
+            running.discard(task)
+            if not running:
+                del self.running[user_id]
+            if self.latest.get(user_id) is task:
+                del self.latest[user_id]
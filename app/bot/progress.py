@@ -0,0 +1,35 @@
+import time
+
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import Message
+
+
+class ProgressMessage:
+    """
+    A placeholder message that is edited as partial results come in.
+
+    Edits are throttled to one per `min_interval` seconds, since Telegram rate-limits
+    edits per chat; updates in between are dropped, except the one passed to `finish()`.
+    """
+
+    def __init__(self, message: Message, min_interval: float):
+        self.message = message
+        self.min_interval = min_interval
+        self._text = message.text
+        self._edited_at = 0.0
+
+    async def update(self, text: str) -> None:
+        if time.monotonic() - self._edited_at >= self.min_interval:
+            await self.finish(text)
+
+    async def finish(self, text: str) -> None:
+        if text == self._text:
+            return
+        self._edited_at = time.monotonic()
+        try:
+            await self.message.edit_text(text)
+        except TelegramAPIError as e:
+            # Progress is cosmetic: skip the edit rather than fail or stall the request
+            print(f"Could not update progress message: {e}")
+            return
+        self._text = text
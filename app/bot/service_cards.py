@@ -0,0 +1,114 @@
+from typing import NamedTuple, Optional
+
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core import invalidation
+from app.core.config import settings
+from app.core.db import async_session_maker
+from app.models import Service
+from app.services import crud
+from app.services.cache import TTLCache
+from app.bot.keyboards.callbacks import ServiceCallback
+
+
+class ServiceCard(NamedTuple):
+    text: str
+    keyboard: InlineKeyboardMarkup
+    updated_at: object
+
+
+def render_service_card(service: Service) -> ServiceCard:
+    response_text = f"<b>{service.name}</b>\n\n"
+    if service.description:
+        response_text += f"📝 {service.description}\n"
+    if service.address:
+        response_text += f"📍 {service.address}\n"
+    if service.phone:
+        response_text += f"📞 {service.phone}\n"
+    if service.schedule:
+        response_text += f"🕒 {service.schedule}\n"
+    if service.social_media:
+        response_text += f"🌐 {service.social_media}\n"
+
+    buttons = []
+    if service.latitude and service.longitude:
+        buttons.append(InlineKeyboardButton(text="🗺️ Показати на мапі", callback_data=ServiceCallback(action="show_map", service_id=service.id).pack()))
+    if service.phone:
+        buttons.append(InlineKeyboardButton(text="📞 Подзвонити", url=f"tel:{service.phone}"))
+    if service.social_media:
+        buttons.append(InlineKeyboardButton(text="🌐 Перейти на сайт", url=service.social_media))
+
+    return ServiceCard(response_text, InlineKeyboardMarkup(inline_keyboard=[buttons]), service.updated_at)
+
+
+class ServiceCardCache:
+    """
+    Rendered detail cards by service id, so repeat views need no query at all.
+
+    Entries are dropped when a service changes (see app.core.invalidation). Each card keeps
+    the updated_at of the row it was rendered from, and a card rendered from an older row
+    never replaces a newer one. Cards are rendered from rows read on the primary (`session_pool`):
+    a lagging replica could hand back a row from before the invalidation, to be cached for the full TTL.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, session_pool: async_sessionmaker):
+        self._cards = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._version = 0
+        self.session_pool = session_pool
+
+    def invalidate(self, key: str = "") -> None:
+        if key:
+            self._cards.invalidate(int(key))
+        else:
+            self._cards.clear()
+        self._version += 1
+
+    def _store(self, service: Service, version: int) -> ServiceCard:
+        card = render_service_card(service)
+        cached = self._cards.get(service.id)
+        # Do not keep a card that was invalidated while its row was loading
+        if version == self._version and (cached is None or cached.updated_at <= card.updated_at):
+            self._cards.set(service.id, card)
+        return card
+
+    async def get(self, service_id: int) -> Optional[ServiceCard]:
+        card = self._cards.get(service_id)
+        if card is not None:
+            return card
+        version = self._version
+        async with self.session_pool() as session:
+            service = await crud.get_service_by_id(session, service_id)
+        if service is None:
+            return None
+        return self._store(service, version)
+
+    async def warm_up(self, limit: int) -> int:
+        """
+        Renders the cards of up to `limit` services ahead of the first views. Returns the number rendered.
+        """
+        version = self._version
+        async with self.session_pool() as session:
+            services, _ = await crud.get_services_page(session, limit)
+        for service in services:
+            self._store(service, version)
+        return len(services)
+
+    def stats(self) -> dict:
+        return self._cards.stats()
+
+
+service_cards = ServiceCardCache(settings.SERVICE_CARD_CACHE_SIZE, settings.SERVICE_CARD_CACHE_TTL, async_session_maker)
+invalidation.subscribe(invalidation.SERVICES, service_cards.invalidate)
+
+
+async def warm_up_service_cards(limit: int) -> None:
+    """
+    Warms the card cache once invalidations are being received, so no change in between is missed.
+    """
+    await invalidation.listening.wait()
+    try:
+        count = await service_cards.warm_up(limit)
+        print(f"Warmed up {count} service cards")
+    except Exception as e:
+        print(f"Error warming up service cards: {e}")
@@ -0,0 +1,199 @@
+"""
+Webhook mode for the bot.
+
+Telegram posts updates to `settings.BOT_WEBHOOK_PATH`. The HTTP handler only validates the
+secret and puts the raw update on the queue of one of BOT_WEBHOOK_WORKERS worker processes,
+chosen by chat id, so all updates of a chat are handled by the same worker. Inside a worker
+updates of different chats run concurrently and updates of the same chat run one after
+another in arrival order. Workers share FSM state through Redis (REDIS_URL).
+
+The router can be mounted into the admin FastAPI app (it is when BOT_WEBHOOK_URL is set)
+or served standalone with `python -m app.bot.webhook`.
+"""
+import asyncio
+import multiprocessing
+import queue
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Request, Response
+
+from app.bot.main import create_bot, create_dispatcher
+from app.bot.service_cards import warm_up_service_cards
+from app.core import invalidation, metrics
+from app.core.config import settings
+from app.services.geocoding_queue import geocoding_worker
+from app.services.embedding_queue import embedding_worker
+
+router = APIRouter()
+
+
+def _chat_id(update: dict) -> int:
+    """
+    Finds the chat (or, failing that, the user) an update belongs to.
+    """
+    for key, value in update.items():
+        if key == "update_id" or not isinstance(value, dict):
+            continue
+        # callback_query carries the chat on the message it was sent from
+        message = value.get("message") if isinstance(value.get("message"), dict) else value
+        if isinstance(message.get("chat"), dict):
+            return message["chat"]["id"]
+        if isinstance(value.get("from"), dict):
+            return value["from"]["id"]
+        if isinstance(value.get("user"), dict):
+            return value["user"]["id"]
+    return 0
+
+
+async def _worker_loop(updates: multiprocessing.Queue) -> None:
+    bot = create_bot()
+    dp = create_dispatcher()
+    invalidation_listener = asyncio.create_task(invalidation.listen())
+    if settings.SERVICE_CARD_WARMUP:
+        asyncio.create_task(warm_up_service_cards(settings.SERVICE_CARD_WARMUP))
+    # Last scheduled task per chat; each new update of the chat waits for it
+    tails: dict[int, asyncio.Task] = {}
+
+    async def handle(chat_id: int, update: dict, previous: Optional[asyncio.Task]) -> None:
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            await dp.feed_raw_update(bot, update)
+        except Exception as e:
+            print(f"Error handling update {update.get('update_id')}: {e}")
+        finally:
+            if tails.get(chat_id) is asyncio.current_task():
+                del tails[chat_id]
+
+    try:
+        while True:
+            update = await asyncio.to_thread(updates.get)
+            if update is None:
+                break
+            chat_id = _chat_id(update)
+            tails[chat_id] = asyncio.create_task(handle(chat_id, update, tails.get(chat_id)))
+        if tails:
+            await asyncio.wait(list(tails.values()))
+    finally:
+        invalidation_listener.cancel()
+        await bot.session.close()
+
+
+def _worker_main(updates: multiprocessing.Queue) -> None:
+    asyncio.run(_worker_loop(updates))
+
+
+class UpdateWorkerPool:
+    """
+    Fans updates out to worker processes by chat id, restarting workers that died.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        # Spawned rather than forked, so workers do not inherit the parent's event loop and pools
+        self._context = multiprocessing.get_context("spawn")
+        self._queues: list[multiprocessing.Queue] = []
+        self._processes: list[Optional[Any]] = []
+
+    def _ensure_worker(self, index: int) -> None:
+        process = self._processes[index]
+        if process is None or not process.is_alive():
+            process = self._context.Process(target=_worker_main, args=(self._queues[index],), daemon=True)
+            process.start()
+            self._processes[index] = process
+
+    def start(self) -> None:
+        # Queues are created here rather than in __init__, so importing this module in a worker creates none
+        self._queues = [self._context.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+        self._processes = [None] * self.workers
+        for index in range(self.workers):
+            self._ensure_worker(index)
+
+    def submit(self, update: dict) -> bool:
+        """
+        Queues an update. Returns False if the worker is overloaded, so Telegram retries it later.
+        """
+        index = _chat_id(update) % len(self._queues)
+        self._ensure_worker(index)
+        try:
+            self._queues[index].put_nowait(update)
+        except queue.Full:
+            return False
+        return True
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        for updates in self._queues:
+            updates.put(None)
+        for process in self._processes:
+            if process is not None:
+                await asyncio.to_thread(process.join, timeout)
+                if process.is_alive():
+                    process.terminate()
+
+
+worker_pool = UpdateWorkerPool(settings.BOT_WEBHOOK_WORKERS, settings.BOT_WEBHOOK_QUEUE_SIZE)
+
+
+@router.post(settings.BOT_WEBHOOK_PATH, include_in_schema=False)
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: Optional[str] = Header(None),
+):
+    if settings.BOT_WEBHOOK_SECRET and x_telegram_bot_api_secret_token != settings.BOT_WEBHOOK_SECRET:
+        raise HTTPException(status_code=403)
+    if not worker_pool.submit(await request.json()):
+        return Response(status_code=503)
+    return Response(status_code=200)
+
+
+async def start_webhook() -> None:
+    """
+    Starts the workers and registers the webhook with Telegram.
+    """
+    worker_pool.start()
+    bot = create_bot()
+    try:
+        await bot.set_webhook(
+            url=settings.BOT_WEBHOOK_URL.rstrip("/") + settings.BOT_WEBHOOK_PATH,
+            secret_token=settings.BOT_WEBHOOK_SECRET,
+        )
+    finally:
+        await bot.session.close()
+
+
+async def stop_webhook() -> None:
+    await worker_pool.stop()
+
+
+def create_app() -> FastAPI:
+    """
+    Standalone webhook server, for running the bot separately from the admin panel.
+    """
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        geocoding_worker.start()
+        if settings.SEMANTIC_SEARCH:
+            embedding_worker.start()
+        await start_webhook()
+        yield
+        await stop_webhook()
+        await embedding_worker.stop()
+        await geocoding_worker.stop()
+
+    app = FastAPI(title="Snovsk Bot Webhook", lifespan=lifespan)
+    app.include_router(router)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        content, content_type = metrics.render()
+        return Response(content=content, media_type=content_type)
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(create_app(), host=settings.BOT_WEBHOOK_HOST, port=settings.BOT_WEBHOOK_PORT)
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -7,5 +8,109 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str
     GOOGLE_MAPS_API_KEY: str
     DATABASE_URL: str
+    # Optional read replica for read-only bot traffic
+    REPLICA_DATABASE_URL: Optional[str] = None
+
+    # Connection pool tuning, applied to the primary and the replica engines
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+
+    # Shared FSM storage for multiple bot processes, e.g. redis://localhost:6379/0
+    REDIS_URL: Optional[str] = None
+
+    # Webhook mode. When BOT_WEBHOOK_URL (the public base URL) is set, the admin app serves the webhook.
+    BOT_WEBHOOK_URL: Optional[str] = None
+    BOT_WEBHOOK_PATH: str = "/bot/webhook"
+    BOT_WEBHOOK_SECRET: Optional[str] = None
+    BOT_WEBHOOK_WORKERS: int = 2
+    BOT_WEBHOOK_QUEUE_SIZE: int = 1000
+    BOT_WEBHOOK_HOST: str = "0.0.0.0"
+    BOT_WEBHOOK_PORT: int = 8080
+
+    # OpenAI client tuning. OPENAI_BASE_URL can point at a local fake server for testing.
+    OPENAI_BASE_URL: Optional[str] = None
+    OPENAI_MAX_CONCURRENCY: int = 8
+    OPENAI_TIMEOUT: float = 30.0
+    OPENAI_MAX_RETRIES: int = 3
+    OPENAI_RETRY_BASE_DELAY: float = 0.5
+    OPENAI_RETRY_MAX_DELAY: float = 8.0
+
+    # Cache for normalized search queries. AI_CACHE_PATH enables the persistent SQLite tier.
+    AI_CACHE_SIZE: int = 2048
+    AI_CACHE_TTL: float = 7 * 24 * 3600
+    AI_CACHE_PATH: Optional[str] = None
+
+    # Geocoding. GAZETTEER_PATH points at an optional offline street gazetteer (see app/services/gazetteer.py).
+    GEOCODE_TIMEOUT: float = 5.0
+    GAZETTEER_PATH: Optional[str] = None
+    GEOCODE_BATCH_SIZE: int = 20
+    GEOCODE_REQUESTS_PER_SECOND: float = 10.0
+    GEOCODE_POLL_INTERVAL: float = 60.0
+    # Seconds before a batch claimed by a worker that died may be claimed again
+    GEOCODE_CLAIM_TIMEOUT: float = 600.0
+    # Seconds a cached "not found" is trusted before the address is sent to Google again
+    GEOCODE_NEGATIVE_TTL: float = 30 * 24 * 3600
+
+    # Speech-to-text. STT_BACKEND is "google" or "vosk" (offline, needs VOSK_MODEL_PATH).
+    STT_BACKEND: str = "google"
+    STT_MAX_CONCURRENCY: int = 4
+    STT_WORKERS: int = 2
+    STT_TIMEOUT: float = 30.0
+    STT_DECODE_TIMEOUT: float = 15.0
+    VOSK_MODEL_PATH: Optional[str] = None
+
+    # Throttling of AI search and voice handlers. Rates are requests per second, limits are per process.
+    THROTTLE_USER_RATE: float = 0.2
+    THROTTLE_USER_BURST: int = 5
+    THROTTLE_GLOBAL_RATE: float = 10.0
+    THROTTLE_GLOBAL_BURST: int = 30
+    THROTTLE_MAX_IN_FLIGHT: int = 2
+    # Seconds a new request waits for the user's cancelled requests before running anyway
+    THROTTLE_SUPERSEDE_TIMEOUT: float = 2.0
+
+    # Minimum seconds between edits of a placeholder message while an AI reply streams in
+    BOT_PROGRESS_EDIT_INTERVAL: float = 1.0
+
+    # Bulk import
+    BULK_IMPORT_CONCURRENCY: int = 8
+    BULK_IMPORT_CHUNK_SIZE: int = 200
+
+    # Background AI extraction jobs (/process-text/jobs)
+    EXTRACTION_JOB_CONCURRENCY: int = 4
+    EXTRACTION_JOB_QUEUE_SIZE: int = 1000
+    EXTRACTION_JOB_TTL: float = 3600
+
+    # Full-text search tuning
+    SEARCH_RESULTS_LIMIT: int = 20
+    SEARCH_SIMILARITY_THRESHOLD: float = 0.4
+
+    # Semantic search. When enabled the bot searches by query embedding, blended with the keyword
+    # rank by SEMANTIC_KEYWORD_WEIGHT (0 for pure semantic search), and skips LLM keyword extraction.
+    SEMANTIC_SEARCH: bool = False
+    SEMANTIC_KEYWORD_WEIGHT: float = 0.3
+    SEMANTIC_MIN_SIMILARITY: float = 0.25
+    EMBEDDING_MODEL: str = "text-embedding-3-small"
+    EMBEDDING_DIMENSIONS: int = 256
+    EMBEDDING_BATCH_SIZE: int = 100
+    EMBEDDING_POLL_INTERVAL: float = 60.0
+
+    # "Near me" search
+    NEARBY_RESULTS_LIMIT: int = 5
+
+    # Rendered service detail cards. SERVICE_CARD_WARMUP cards are rendered when the bot starts.
+    SERVICE_CARD_CACHE_SIZE: int = 5000
+    SERVICE_CARD_CACHE_TTL: float = 24 * 3600
+    SERVICE_CARD_WARMUP: int = 0
+
+    # Category listing pages. With REDIS_URL set, bot workers also share them through Redis.
+    CATEGORY_PAGE_CACHE_SIZE: int = 2000
+    CATEGORY_PAGE_CACHE_TTL: float = 3600
+
+    # Shared by the bot and admin panel processes so /metrics can aggregate them (see app.core.metrics)
+    PROMETHEUS_MULTIPROC_DIR: Optional[str] = None
 
 settings = Settings()
\ No newline at end of file
@@ -1,12 +1,66 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import Delete, Insert, Select, Update
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, declarative_base
 
 from .config import settings
 
-engine = create_async_engine(settings.DATABASE_URL)
+def _engine_options(url: str) -> dict:
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if make_url(url).get_driver_name() == "asyncpg":
+        # Set to 0 when running behind pgbouncer in transaction mode
+        options["connect_args"] = {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    return options
+
+engine = create_async_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
+replica_engine = (
+    create_async_engine(settings.REPLICA_DATABASE_URL, **_engine_options(settings.REPLICA_DATABASE_URL))
+    if settings.REPLICA_DATABASE_URL
+    else None
+)
+
+
+class RoutingSession(Session):
+    """
+    Sends reads to the replica and writes to the primary. Once a session has written
+    (or locked rows) it stays on the primary, so it always reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self.info.get("use_primary")
+            or self._flushing
+            or isinstance(clause, (Insert, Update, Delete))
+            or (isinstance(clause, Select) and clause._for_update_arg is not None)
+        ):
+            self.info["use_primary"] = True
+            return engine.sync_engine
+        return replica_engine.sync_engine
+
+
+def use_primary(session: AsyncSession) -> None:
+    """
+    Pins a routing session to the primary for the rest of its lifetime.
+    """
+    session.info["use_primary"] = True
+
+
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
+# Read-mostly bot traffic. Without a replica this is the primary session maker.
+read_session_maker = (
+    async_sessionmaker(sync_session_class=RoutingSession, expire_on_commit=False)
+    if replica_engine
+    else async_session_maker
+)
 Base = declarative_base()
 
 async def get_async_session():
+    # The admin panel writes and then immediately reads back, so it always uses the primary
     async with async_session_maker() as session:
-        yield session
\ No newline at end of file
+        yield session
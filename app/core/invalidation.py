@@ -0,0 +1,95 @@
+"""
+Cross-process cache invalidation over Postgres LISTEN/NOTIFY.
+
+Writers call `publish()` inside their transaction, so the notification is only delivered
+once the change is committed, and `dispatch()` after the commit to invalidate the caches of
+their own process right away. Every process that runs `listen()` receives the notification
+and invalidates its caches too.
+"""
+import asyncio
+from collections import defaultdict
+from typing import Callable
+
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import use_primary
+
+CHANNEL = "snovsk_cache_invalidation"
+
+# Topics
+MENU = "menu"
+CATEGORIES = "categories"
+# Keyed by service id, or "" for every service
+SERVICES = "services"
+# Category listing pages, keyed by category id, or "" for every category
+CATEGORY_PAGES = "category_pages"
+# Service embeddings for semantic search
+EMBEDDINGS = "embeddings"
+# Topic dispatched after (re)connecting, since notifications may have been missed meanwhile
+ALL = "*"
+
+_subscribers: dict[str, list[Callable[[str], None]]] = defaultdict(list)
+# Set while `listen()` is connected, i.e. while caches filled now are kept up to date
+listening = asyncio.Event()
+
+
+def subscribe(topic: str, callback: Callable[[str], None]) -> None:
+    """
+    Registers a callback that receives the key of every invalidation published for the topic.
+    """
+    _subscribers[topic].append(callback)
+
+
+def dispatch(topic: str, key: str = "") -> None:
+    """
+    Invalidates the caches of the current process.
+    """
+    topics = list(_subscribers) if topic == ALL else [topic]
+    for name in topics:
+        for callback in _subscribers[name]:
+            callback(key)
+
+
+async def publish(session: AsyncSession, topic: str, key: str = "") -> None:
+    """
+    Queues an invalidation for other processes. It is delivered when the session's transaction commits.
+    """
+    # NOTIFY cannot run on a read replica
+    use_primary(session)
+    await session.execute(select(func.pg_notify(CHANNEL, f"{topic}:{key}")))
+
+
+def _on_notification(connection, pid, channel, payload: str) -> None:
+    topic, _, key = payload.partition(":")
+    dispatch(topic, key)
+
+
+async def listen(reconnect_delay: float = 5.0) -> None:
+    """
+    Listens for invalidations from other processes until cancelled, reconnecting on errors.
+    """
+    dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+    while True:
+        try:
+            connection = await asyncpg.connect(dsn)
+            try:
+                await connection.add_listener(CHANNEL, _on_notification)
+                dispatch(ALL)
+                listening.set()
+                # Block until the connection drops
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await closed.wait()
+            finally:
+                listening.clear()
+                await connection.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Cache invalidation listener error: {e}")
+        dispatch(ALL)
+        await asyncio.sleep(reconnect_delay)
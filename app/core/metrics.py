@@ -0,0 +1,122 @@
+"""
+Prometheus metrics for the bot, the admin panel and their calls to external services.
+
+Latencies are recorded as histograms, so percentiles are computed in Prometheus, e.g. the p95
+of every bot handler:
+
+    histogram_quantile(0.95, sum by (le, handler) (rate(bot_handler_duration_seconds_bucket[5m])))
+
+The bot and the admin panel run in separate processes. To serve the bot's metrics from the
+admin panel's /metrics, set PROMETHEUS_MULTIPROC_DIR to the same directory for all of them:
+every process then writes its samples there and /metrics aggregates them. The directory must
+be emptied before the processes start.
+"""
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Iterator
+
+from app.core.config import settings
+
+if settings.PROMETHEUS_MULTIPROC_DIR:
+    # prometheus_client chooses where to keep samples when it is imported
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.PROMETHEUS_MULTIPROC_DIR)
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# From 5 ms database reads to slow LLM completions
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+BOT_HANDLER_DURATION = Histogram(
+    "bot_handler_duration_seconds",
+    "Time spent in bot handlers",
+    ["event", "handler"],
+    buckets=LATENCY_BUCKETS,
+)
+TELEGRAM_REQUEST_DURATION = Histogram(
+    "telegram_request_duration_seconds",
+    "Latency of Telegram Bot API requests",
+    ["method"],
+    buckets=LATENCY_BUCKETS,
+)
+EXTERNAL_CALL_DURATION = Histogram(
+    "external_call_duration_seconds",
+    "Latency of calls to OpenAI, speech recognition and the geocoder",
+    ["service", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+EXTERNAL_CALL_ERRORS = Counter(
+    "external_call_errors",
+    "Failed calls to external services",
+    ["service", "operation"],
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Latency of crud functions",
+    ["query"],
+    buckets=LATENCY_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups",
+    "Lookups in the in-process and persistent caches",
+    ["cache", "result"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latency of admin panel requests",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+@contextmanager
+def track_external(service: str, operation: str) -> Iterator[None]:
+    """
+    Times a call to an external service and counts it as failed if it raises.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        EXTERNAL_CALL_ERRORS.labels(service, operation).inc()
+        raise
+    finally:
+        EXTERNAL_CALL_DURATION.labels(service, operation).observe(time.perf_counter() - started)
+
+
+def timed_query(func):
+    """
+    Records the duration of a crud coroutine under its name.
+    """
+    histogram = DB_QUERY_DURATION.labels(func.__name__)
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+def render() -> tuple[bytes, str]:
+    """
+    Returns the metrics exposition and its content type, aggregated over all processes in multiprocess mode.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
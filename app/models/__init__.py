@@ -1,5 +1,7 @@
 from .category import Category
 from .service import Service
 from .menu_button import MenuButton
+from .geocode_cache import GeocodeCache
+from .service_embedding import ServiceEmbedding
 
-__all__ = ["Category", "Service"]
\ No newline at end of file
+__all__ = ["Category", "Service", "GeocodeCache", "ServiceEmbedding"]
\ No newline at end of file
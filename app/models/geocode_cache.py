@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Float, DateTime, func
+
+from app.core.db import Base
+
+class GeocodeCache(Base):
+    __tablename__ = "geocode_cache"
+
+    # Normalized address, see app.services.maps.normalize_address
+    address = Column(String(255), primary_key=True)
+    # Both are NULL when the geocoder found nothing, so the miss is not retried on every save.
+    # Misses older than GEOCODE_NEGATIVE_TTL are ignored and looked up again.
+    latitude = Column(Float)
+    longitude = Column(Float)
+    source = Column(String(20), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
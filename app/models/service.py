@@ -1,10 +1,32 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, DateTime, Index, Computed, UniqueConstraint, func, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 
 from app.core.db import Base
 
+# Postgres has no Ukrainian stemmer, so the vector uses the 'simple' configuration
+# and inflected forms are matched through prefix queries and trigram similarity.
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(address, '')), 'C')"
+)
+
+GEOCODE_PENDING = "pending"
+GEOCODE_DONE = "done"
+GEOCODE_FAILED = "failed"
+
 class Service(Base):
     __tablename__ = "services"
+    __table_args__ = (
+        UniqueConstraint("name", "category_id", name="uq_service_name_category"),
+        Index("ix_services_category_id_id", "category_id", "id"),
+        Index("ix_services_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_services_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_services_description_trgm", "description", postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"}),
+        Index("ix_services_address_trgm", "address", postgresql_using="gin", postgresql_ops={"address": "gin_trgm_ops"}),
+        Index("ix_services_geocode_pending", "id", postgresql_where=text("geocode_status = 'pending'")),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String(200), nullable=False)
@@ -15,6 +37,21 @@ class Service(Base):
     description = Column(Text)
     latitude = Column(Float)
     longitude = Column(Float)
+    # "pending" until the background geocoder fills in the coordinates, then "done" or "failed"
+    geocode_status = Column(String(20))
+    # When a geocoding worker claimed the pending row; claims expire after GEOCODE_CLAIM_TIMEOUT
+    geocode_claimed_at = Column(DateTime(timezone=True))
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_EXPRESSION, persisted=True)))
+    # Versions the cached detail cards, see app.bot.service_cards
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
     
     category_id = Column(Integer, ForeignKey("categories.id"))
-    category = relationship("Category", back_populates="services")
\ No newline at end of file
+    category = relationship("Category", back_populates="services")
+
+# KNN index for "near me" lookups, see crud.get_nearby_services
+Index(
+    "ix_services_earth",
+    func.ll_to_earth(Service.latitude, Service.longitude),
+    postgresql_using="gist",
+    postgresql_where=Service.latitude.isnot(None) & Service.longitude.isnot(None),
+)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, LargeBinary, DateTime, ForeignKey
+
+from app.core.db import Base
+
+class ServiceEmbedding(Base):
+    __tablename__ = "service_embeddings"
+
+    service_id = Column(Integer, ForeignKey("services.id", ondelete="CASCADE"), primary_key=True)
+    model = Column(String(100), nullable=False)
+    # Hash of the embedded text, so unchanged services are not sent to the API again
+    content_hash = Column(String(64), nullable=False)
+    # float32 vector, see app.services.embeddings; empty if the API rejected the text
+    embedding = Column(LargeBinary, nullable=False)
+    # services.updated_at of the row that was embedded; the embedding is stale once they differ
+    service_updated_at = Column(DateTime(timezone=True), nullable=False)
@@ -1,15 +1,152 @@
+import asyncio
 import json
-from typing import Optional
-from openai import OpenAI
+import random
+import re
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+import openai
+from openai import AsyncOpenAI
 from app.core.config import settings
-from app.web.schemas import ServiceData
+from app.core.metrics import track_external
+from app.web.schemas import ServiceData, SearchQuery
+from app.services.cache import TTLCache, SQLiteCache, TieredCache
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+# Retries are handled below, together with the concurrency limit and coalescing
+client = AsyncOpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    base_url=settings.OPENAI_BASE_URL,
+    max_retries=0,
+)
 
-def get_service_data_from_text(text: str) -> Optional[ServiceData]:
+_RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+# Normalized search queries keyed on the normalized input text
+search_query_cache = TieredCache(
+    TTLCache(maxsize=settings.AI_CACHE_SIZE, ttl=settings.AI_CACHE_TTL, name="search_query"),
+    SQLiteCache(settings.AI_CACHE_PATH, ttl=settings.AI_CACHE_TTL, name="search_query_sqlite") if settings.AI_CACHE_PATH else None,
+)
+
+# Query embeddings keyed on the normalized query text
+query_embedding_cache = TTLCache(maxsize=settings.AI_CACHE_SIZE, ttl=settings.AI_CACHE_TTL)
+
+_semaphore: Optional[asyncio.Semaphore] = None
+_in_flight: dict[str, asyncio.Task] = {}
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    # Created lazily so it binds to the running event loop
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY)
+    return _semaphore
+
+
+async def _with_retries(operation: str, request: Callable[[], Awaitable[Any]]) -> Any:
     """
-    Використовує OpenAI для вилучення структурованих даних про послуги з необробленого тексту.
+    Sends one API request, retrying transient failures with exponential backoff and full jitter.
+    """
+    for attempt in range(settings.OPENAI_MAX_RETRIES + 1):
+        try:
+            async with _get_semaphore():
+                with track_external("openai", operation):
+                    return await request()
+        except _RETRYABLE_ERRORS:
+            if attempt == settings.OPENAI_MAX_RETRIES:
+                raise
+            delay = min(settings.OPENAI_RETRY_MAX_DELAY, settings.OPENAI_RETRY_BASE_DELAY * 2 ** attempt)
+            await asyncio.sleep(random.uniform(0, delay))
+
+
+async def _request_chat_completion(model: str, messages: list[dict], response_format: Optional[dict]) -> str:
+    kwargs = {"response_format": response_format} if response_format else {}
+    response = await _with_retries("chat_completion", lambda: client.chat.completions.create(
+        model=model,
+        messages=messages,
+        timeout=settings.OPENAI_TIMEOUT,
+        **kwargs,
+    ))
+    return response.choices[0].message.content
+
+
+async def _chat_completion(messages: list[dict], response_format: Optional[dict] = None, model: str = "gpt-4o") -> str:
+    """
+    Runs a chat completion. Identical concurrent requests share a single API call.
+    """
+    key = json.dumps([model, messages, response_format], ensure_ascii=False, sort_keys=True)
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_request_chat_completion(model, messages, response_format))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    # Shield the shared request so one cancelled caller does not cancel it for the others
+    return await asyncio.shield(task)
+
+
+async def _stream_chat_completion(messages: list[dict], response_format: Optional[dict] = None, model: str = "gpt-4o") -> AsyncIterator[str]:
+    """
+    Streams a chat completion, yielding the content received so far after every chunk.
+
+    Opening the stream is retried like a regular request; a stream that breaks off midway is not.
+    Streams are not coalesced, since every caller wants its own progress.
+
+    A concurrency slot is only held while the stream is opened or read, not while the caller
+    handles the content. Consume with contextlib.aclosing(), so the stream is closed as soon as
+    the caller stops, e.g. when it is cancelled.
+    """
+    kwargs = {"response_format": response_format} if response_format else {}
+    # Time to the first byte; the stream itself is paced by the model
+    stream = await _with_retries("chat_completion_stream", lambda: client.chat.completions.create(
+        model=model,
+        messages=messages,
+        stream=True,
+        timeout=settings.OPENAI_TIMEOUT,
+        **kwargs,
+    ))
+    try:
+        chunks = stream.__aiter__()
+        content = ""
+        while True:
+            async with _get_semaphore():
+                try:
+                    chunk = await chunks.__anext__()
+                except StopAsyncIteration:
+                    break
+            if chunk.choices and chunk.choices[0].delta.content:
+                content += chunk.choices[0].delta.content
+                yield content
+    finally:
+        await stream.close()
+
+
+# A top-level "key": value pair whose value (a string, null or a list of strings) has been received in full
+_COMPLETE_FIELD_RE = re.compile(
+    r'"(\w+)"\s*:\s*("(?:[^"\\]|\\.)*"|null|\[\s*(?:"(?:[^"\\]|\\.)*"\s*,?\s*)*\])'
+)
+
+
+async def _stream_json_fields(messages: list[dict]) -> AsyncIterator[dict]:
+    """
+    Streams a JSON-object completion, yielding the fields received so far whenever another
+    one is complete. The last item is the whole object.
     """
+    fields: dict = {}
+    content = ""
+    async with aclosing(_stream_chat_completion(messages, response_format={"type": "json_object"})) as stream:
+        async for content in stream:
+            partial = {match[1]: json.loads(match[2]) for match in _COMPLETE_FIELD_RE.finditer(content)}
+            if len(partial) > len(fields):
+                fields = partial
+                yield fields
+    data = json.loads(content)
+    if data != fields:
+        yield data
+
+def _service_data_messages(text: str) -> list[dict]:
     prompt = f"""
     Проаналізуй наступний текст і витягни з нього структуровану інформацію про послугу.
     Текст: "{text}"
@@ -25,104 +162,155 @@ def get_service_data_from_text(text: str) -> Optional[ServiceData]:
 
     Якщо якась інформація відсутня, залиш для відповідного ключа значення null.
     """
+    return [
+        {"role": "system", "content": "You are a helpful assistant that extracts structured data from text and returns it as JSON."},
+        {"role": "user", "content": prompt}
+    ]
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that extracts structured data from text and returns it as JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        data = json.loads(response.choices[0].message.content)
-        return ServiceData(**data)
+async def extract_service_data(text: str) -> ServiceData:
+    """
+    Like `get_service_data_from_text`, but raises if the data could not be extracted.
+    """
+    content = await _chat_completion(
+        messages=_service_data_messages(text),
+        response_format={"type": "json_object"}
+    )
+    return ServiceData(**json.loads(content))
 
+async def get_service_data_from_text(text: str) -> Optional[ServiceData]:
+    """
+    Використовує OpenAI для вилучення структурованих даних про послуги з необробленого тексту.
+    """
+    try:
+        return await extract_service_data(text)
     except Exception as e:
         print(f"Error processing text with OpenAI: {e}")
         return None
 
-def get_search_query_from_text(text: str) -> Optional[str]:
+async def stream_service_data_from_text(text: str) -> AsyncIterator[dict]:
     """
-    Використовує OpenAI для вилучення пошукового запиту з необробленого тексту.
+    Streaming variant of `get_service_data_from_text`: yields the fields extracted so far as they
+    arrive. The last item is the complete data; validate it with ServiceData. Raises if the stream
+    fails before the whole object has arrived, so partial fields are never mistaken for the result.
     """
-    prompt = f"""
-    Проаналізуй наступний запит користувача та поверни ключові слова для пошуку в базі даних послуг.
-    Запит: "{text}"
+    try:
+        async with aclosing(_stream_json_fields(_service_data_messages(text))) as stream:
+            async for fields in stream:
+                yield fields
+    except Exception as e:
+        print(f"Error processing text with OpenAI: {e}")
+        raise
+
+# Words that mark a conversational request rather than a ready keyword query
+_QUERY_STOP_WORDS = {
+    "де", "як", "хто", "що", "коли", "куди", "чи", "мені", "треба", "потрібно",
+    "потрібен", "потрібна", "шукаю", "знайти", "підкажіть", "порадьте", "можна",
+}
+_UKRAINIAN_WORD_RE = re.compile(r"[абвгґдеєжзиіїйклмнопрстуфхцчшщьюя'’ʼ-]+")
+MAX_LOCAL_QUERY_WORDS = 2
+
+def is_plain_ukrainian_query(text: str) -> bool:
+    """
+    Checks whether the text is already a short Ukrainian keyword query that can be searched without the LLM.
+    """
+    words = text.lower().split()
+    if not words or len(words) > MAX_LOCAL_QUERY_WORDS:
+        return False
+    return all(_UKRAINIAN_WORD_RE.fullmatch(word) and word not in _QUERY_STOP_WORDS for word in words)
+
+def _cache_key(text: str) -> str:
+    # Case, surrounding punctuation and repeated whitespace do not change the meaning of a query
+    return " ".join(text.lower().split()).strip(" .,!?;:\"'«»")
 
-    Поверни лише ключові слова, без зайвих пояснень. Наприклад, якщо користувач шукає "де підстригтися", поверни "стрижка" або "перукарня".
-    Якщо користувач шукає "ремонт колеса", поверни "шиномонтаж" або "ремонт коліс".
+async def normalize_search_query(text: str) -> Optional[SearchQuery]:
+    """
+    Translates a user query to Ukrainian and extracts search keywords from it in a single OpenAI call.
+    Results are cached, so repeated queries skip the API entirely.
     """
+    cache_key = _cache_key(text)
+    cached = await search_query_cache.get(cache_key)
+    if cached is not None:
+        return SearchQuery(**cached)
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that extracts keywords for a database search from user queries."},
-                {"role": "user", "content": prompt}
-            ]
+        content = await _chat_completion(
+            messages=_search_query_messages(text),
+            response_format={"type": "json_object"}
         )
-        
-        return response.choices[0].message.content
+
+        search_query = SearchQuery(**json.loads(content))
+        await search_query_cache.set(cache_key, search_query.model_dump())
+        return search_query
 
     except Exception as e:
         print(f"Error processing search query with OpenAI: {e}")
         return None
-def translate_to_ukrainian(text: str) -> str:
-    """
-    Translates text from Russian to Ukrainian using OpenAI.
-    If the text is already in Ukrainian, it returns the original text.
+
+async def stream_normalize_search_query(text: str) -> AsyncIterator[dict]:
     """
-    prompt = f"""
-    Переклади наступний текст на українську мову. Якщо текст вже написаний українською, поверни його без змін.
-    Текст: "{text}"
+    Streaming variant of `normalize_search_query`: yields the SearchQuery fields received so far.
+    The last item is the complete query, which is cached like the non-streaming result. Raises if
+    the stream fails before the whole object has arrived.
     """
+    cache_key = _cache_key(text)
+    cached = await search_query_cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that translates text from Russian to Ukrainian."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        return response.choices[0].message.content
-
+        fields: dict = {}
+        async with aclosing(_stream_json_fields(_search_query_messages(text))) as stream:
+            async for fields in stream:
+                yield fields
+        await search_query_cache.set(cache_key, SearchQuery(**fields).model_dump())
     except Exception as e:
-        print(f"Error translating text with OpenAI: {e}")
-        return text
-import speech_recognition as sr
-from pydub import AudioSegment
-import io
+        print(f"Error processing search query with OpenAI: {e}")
+        raise
 
-def recognize_speech_from_bytes(audio_bytes: bytes) -> Optional[str]:
+def _search_query_messages(text: str) -> list[dict]:
+    prompt = f"""
+    Проаналізуй наступний запит користувача до довідника послуг.
+    Запит: "{text}"
+
+    Поверни відповідь у форматі JSON з такими ключами:
+    - language: Код мови запиту (наприклад, "uk" або "ru")
+    - text: Запит, перекладений українською мовою. Якщо запит вже українською, поверни його без змін.
+    - keywords: Список ключових слів українською для пошуку в базі даних послуг.
+
+    Наприклад, якщо користувач шукає "де підстригтися", поверни ключові слова ["стрижка", "перукарня"].
+    Якщо користувач шукає "ремонт колеса", поверни ["шиномонтаж", "ремонт коліс"].
     """
-    Recognizes speech from audio bytes and returns the text.
+    return [
+        {"role": "system", "content": "You are a helpful assistant that normalizes user queries to Ukrainian and extracts database search keywords, returning JSON."},
+        {"role": "user", "content": prompt}
+    ]
+
+async def get_embeddings(texts: list[str]) -> list[list[float]]:
     """
-    recognizer = sr.Recognizer()
-    
+    Embeds a batch of texts in one request. Raises on API errors.
+    """
+    response = await _with_retries("embeddings", lambda: client.embeddings.create(
+        model=settings.EMBEDDING_MODEL,
+        input=texts,
+        dimensions=settings.EMBEDDING_DIMENSIONS,
+        timeout=settings.OPENAI_TIMEOUT,
+    ))
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+async def get_query_embedding(text: str) -> Optional[list[float]]:
+    """
+    Embeds a search query. Results are cached, so repeated queries skip the API entirely.
+    """
+    cache_key = _cache_key(text)
+    cached = query_embedding_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        # Convert OGG to WAV
-        audio = AudioSegment.from_file(io.BytesIO(audio_bytes), format="ogg")
-        wav_io = io.BytesIO()
-        audio.export(wav_io, format="wav")
-        wav_io.seek(0)
-
-        with sr.AudioFile(wav_io) as source:
-            audio_data = recognizer.record(source)
-        
-        # Recognize speech using Google Web Speech API
-        text = recognizer.recognize_google(audio_data, language="uk-UA")
-        return text
-
-    except sr.UnknownValueError:
-        print("Google Web Speech API could not understand the audio")
-        return None
-    except sr.RequestError as e:
-        print(f"Could not request results from Google Web Speech API; {e}")
-        return None
+        embedding = (await get_embeddings([text]))[0]
     except Exception as e:
-        print(f"Error processing audio: {e}")
-        return None
\ No newline at end of file
+        print(f"Error embedding search query with OpenAI: {e}")
+        return None
+    query_embedding_cache.set(cache_key, embedding)
+    return embedding
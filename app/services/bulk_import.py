@@ -0,0 +1,218 @@
+"""
+Bulk import of services from CSV, JSONL or pasted raw listings.
+
+Records are processed in chunks. For each chunk the raw listings are run through
+`extract_service_data` concurrently, all category names are resolved with one
+lookup, and the services are written with a single INSERT ... ON CONFLICT on
+uq_service_name_category in one transaction. Services with an address are left for the
+background geocoder, which geocodes them in batches.
+"""
+import asyncio
+import csv
+import itertools
+import json
+from dataclasses import dataclass, asdict, field
+from typing import Iterable, Iterator, Optional, Union
+
+from pydantic import ValidationError
+from sqlalchemy import case, func, null, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import invalidation
+from app.models import Category, Service
+from app.models.service import GEOCODE_PENDING
+from app.services.ai import extract_service_data
+from app.services.category_pages import dispatch_category_pages, publish_category_pages
+from app.services.geocoding_queue import geocoding_worker
+from app.services.embedding_queue import embedding_worker
+from app.web.schemas import ServiceData
+
+FORMATS = ("csv", "jsonl", "raw")
+SERVICE_FIELDS = ("name", "address", "phone", "schedule", "social_media", "description")
+
+# Only the first errors are kept in the report, so a broken file does not produce a huge one
+MAX_REPORTED_ERRORS = 100
+
+
+@dataclass
+class InvalidRecord:
+    """
+    Stands in for an input record that could not be parsed, so the import can go on.
+    """
+    error: str
+
+
+# A record is either structured service data, a raw listing that still needs AI extraction,
+# or an input record that could not be parsed
+Record = Union[dict, str, InvalidRecord]
+
+
+@dataclass
+class ImportReport:
+    total: int = 0
+    extracted: int = 0
+    failed: int = 0
+    imported: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    def add_error(self, error: str) -> None:
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(error)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def parse_records(lines: Iterable[str], fmt: str) -> Iterator[Record]:
+    """
+    Lazily parses an input stream into records.
+
+    - csv:   a header row with ServiceData field names
+    - jsonl: one JSON object per line, either ServiceData fields or {"text": "<raw listing>"}
+    - raw:   raw listings separated by blank lines
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            # Extra cells end up under the None key, missing ones are None
+            if None in row:
+                yield InvalidRecord(f"Line {reader.line_num}: more cells than header columns")
+                continue
+            yield {key: value or None for key, value in row.items()}
+    elif fmt == "jsonl":
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield InvalidRecord(f"Line {line_number}: invalid JSON: {e}")
+                continue
+            if not isinstance(record, dict):
+                yield InvalidRecord(f"Line {line_number}: expected a JSON object")
+                continue
+            yield record["text"] if set(record) == {"text"} else record
+    elif fmt == "raw":
+        listing: list[str] = []
+        for line in itertools.chain(lines, [""]):
+            if line.strip():
+                listing.append(line.rstrip("\n"))
+            elif listing:
+                yield "\n".join(listing)
+                listing = []
+    else:
+        raise ValueError(f"Unknown import format '{fmt}', expected one of {FORMATS}")
+
+
+async def _to_service_data(
+    number: int, record: Record, semaphore: asyncio.Semaphore, report: ImportReport
+) -> Optional[ServiceData]:
+    if isinstance(record, InvalidRecord):
+        report.add_error(record.error)
+        return None
+    if isinstance(record, str):
+        async with semaphore:
+            try:
+                return await extract_service_data(record)
+            except Exception as e:
+                print(f"Error extracting record {number}: {e}")
+                report.add_error(f"Record {number}: could not extract service data: {e}")
+                return None
+    try:
+        return ServiceData(**record)
+    except (ValidationError, TypeError) as e:
+        print(f"Skipping invalid record {record}: {e}")
+        report.add_error(f"Invalid record {record}: {e}")
+        return None
+
+
+async def _resolve_categories(session: AsyncSession, names: set[str]) -> tuple[dict[str, int], bool]:
+    """
+    Maps category names to ids with one lookup, creating the missing categories.
+    Returns the map and whether any category was created, which is then published.
+    """
+    created = (await session.execute(
+        insert(Category)
+        .values([{"name": name} for name in names])
+        .on_conflict_do_nothing(index_elements=[Category.name])
+        .returning(Category.id)
+    )).all()
+    if created:
+        await invalidation.publish(session, invalidation.CATEGORIES)
+    result = await session.execute(select(Category.name, Category.id).where(Category.name.in_(names)))
+    return dict(result.all()), bool(created)
+
+
+async def _write_chunk(session: AsyncSession, services: list[ServiceData]) -> int:
+    category_names = {
+        service.category if isinstance(service.category, str) else service.category.name
+        for service in services
+    }
+    category_ids, categories_created = await _resolve_categories(session, category_names)
+
+    # The same service may appear twice in one chunk; ON CONFLICT cannot touch a row twice per statement
+    rows = {}
+    for service in services:
+        category_name = service.category if isinstance(service.category, str) else service.category.name
+        row = {field: getattr(service, field) for field in SERVICE_FIELDS}
+        row["category_id"] = category_ids[category_name]
+        row["geocode_status"] = GEOCODE_PENDING if service.address else None
+        rows[(row["name"], row["category_id"])] = row
+
+    stmt = insert(Service).values(list(rows.values()))
+    address_changed = Service.address.is_distinct_from(stmt.excluded.address)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_service_name_category",
+        set_={
+            **{field: stmt.excluded[field] for field in SERVICE_FIELDS if field != "name"},
+            # Keep existing coordinates unless the address changed
+            "latitude": case((address_changed, null()), else_=Service.latitude),
+            "longitude": case((address_changed, null()), else_=Service.longitude),
+            "geocode_status": case((address_changed, stmt.excluded.geocode_status), else_=Service.geocode_status),
+            "geocode_claimed_at": case((address_changed, null()), else_=Service.geocode_claimed_at),
+            # onupdate is not applied to ON CONFLICT DO UPDATE
+            "updated_at": func.now(),
+        },
+    )
+    await session.execute(stmt)
+    # Existing services may have been overwritten, so drop every cached card
+    category_ids = {row["category_id"] for row in rows.values()}
+    await invalidation.publish(session, invalidation.SERVICES)
+    await publish_category_pages(session, *category_ids)
+    await session.commit()
+    invalidation.dispatch(invalidation.SERVICES)
+    if categories_created:
+        invalidation.dispatch(invalidation.CATEGORIES)
+    await dispatch_category_pages(*category_ids)
+    return len(rows)
+
+
+async def import_services(
+    session: AsyncSession,
+    records: Iterable[Record],
+    concurrency: int,
+    chunk_size: int,
+) -> ImportReport:
+    """
+    Imports services chunk by chunk, committing each chunk in its own transaction.
+    """
+    report = ImportReport()
+    semaphore = asyncio.Semaphore(concurrency)
+    records = iter(records)
+    while chunk := list(itertools.islice(records, chunk_size)):
+        # Records are numbered from 1 in input order
+        first = report.total + 1
+        report.total += len(chunk)
+        results = await asyncio.gather(*(
+            _to_service_data(number, record, semaphore, report)
+            for number, record in enumerate(chunk, start=first)
+        ))
+        report.extracted += sum(1 for record, result in zip(chunk, results) if isinstance(record, str) and result)
+        services = [result for result in results if result]
+        report.failed += len(chunk) - len(services)
+        if services:
+            report.imported += await _write_chunk(session, services)
+            geocoding_worker.notify()
+            embedding_worker.notify()
+    return report
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.core.metrics import CACHE_LOOKUPS
+
+
+class TTLCache:
+    """
+    In-process LRU cache whose entries also expire after `ttl` seconds.
+    Lookups of a named cache are counted in the cache_lookups metric.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, name: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._hit_counter = CACHE_LOOKUPS.labels(name, "hit") if name else None
+        self._miss_counter = CACHE_LOOKUPS.labels(name, "miss") if name else None
+
+    def get(self, key: Any) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            if self._miss_counter is not None:
+                self._miss_counter.inc()
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        if self._hit_counter is not None:
+            self._hit_counter.inc()
+        return entry[1]
+
+    def set(self, key: Any, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Any) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class SQLiteCache:
+    """
+    Persistent key/value cache stored in a local SQLite file. Values are stored as JSON.
+
+    The file is accessed from worker threads, so disk I/O never blocks the event loop.
+    Expired rows are purged at most every `purge_interval` seconds, when a value is stored.
+    """
+
+    def __init__(self, path: str, ttl: float, name: Optional[str] = None, purge_interval: float = 3600):
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self.hits = 0
+        self.misses = 0
+        self._hit_counter = CACHE_LOOKUPS.labels(name, "hit") if name else None
+        self._miss_counter = CACHE_LOOKUPS.labels(name, "miss") if name else None
+        self._next_purge = 0.0
+        # One connection shared by the worker threads, used by one of them at a time
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+        self._conn.commit()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + self.ttl),
+            )
+            if now >= self._next_purge:
+                self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+                self._next_purge = now + self.purge_interval
+            self._conn.commit()
+
+    def _execute(self, sql: str, params: tuple = ()) -> None:
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await asyncio.to_thread(self._get, key)
+        if value is None:
+            self.misses += 1
+            if self._miss_counter is not None:
+                self._miss_counter.inc()
+            return None
+        self.hits += 1
+        if self._hit_counter is not None:
+            self._hit_counter.inc()
+        return json.loads(value)
+
+    async def set(self, key: str, value: Any) -> None:
+        await asyncio.to_thread(self._set, key, json.dumps(value, ensure_ascii=False))
+
+    async def invalidate(self, key: str) -> None:
+        await asyncio.to_thread(self._execute, "DELETE FROM cache WHERE key = ?", (key,))
+
+    async def clear(self) -> None:
+        await asyncio.to_thread(self._execute, "DELETE FROM cache")
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class TieredCache:
+    """
+    Two-level cache: an in-process LRU tier in front of an optional persistent tier.
+    Persistent hits are promoted into the in-process tier.
+    """
+
+    def __init__(self, memory: TTLCache, persistent: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.persistent = persistent
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None and self.persistent is not None:
+            value = await self.persistent.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            await self.persistent.set(key, value)
+
+    async def invalidate(self, key: str) -> None:
+        self.memory.invalidate(key)
+        if self.persistent is not None:
+            await self.persistent.invalidate(key)
+
+    async def clear(self) -> None:
+        self.memory.clear()
+        if self.persistent is not None:
+            await self.persistent.clear()
+
+    def stats(self) -> dict:
+        stats = {"memory": self.memory.stats()}
+        if self.persistent is not None:
+            stats["persistent"] = self.persistent.stats()
+        return stats
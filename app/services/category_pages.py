@@ -0,0 +1,191 @@
+"""
+Cache of category listing pages, keyed by (category, page, page size).
+
+Every category has a version stamp, and a cached page is only served while the stamp it was
+stored under is current. Writers call `publish_category_pages()` in the transaction that
+changes a listing and `dispatch_category_pages()` after the commit, like the other
+app.core.invalidation topics.
+
+There are two tiers. The in-process tier serves repeat views without any I/O. When
+REDIS_URL is set, a shared tier lets the bot workers fill pages for each other. Its entries
+are keyed by stamps kept in Redis, which writers bump after the commit so older entries stop
+being looked up. Every shared entry also records when its load started, and a process only
+accepts an entry loaded after the last invalidation it received for the category. A
+notified process therefore never refills from a stale entry, even before the bump (or if the
+bump fails). Rejected entries are overwritten with the fresh page.
+
+Pages are loaded from the primary, since a lagging replica could return a listing from
+before the change that invalidated it.
+"""
+import json
+import time
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core import invalidation
+from app.core.config import settings
+from app.core.db import async_session_maker
+from app.services.cache import TTLCache
+
+KEY_PREFIX = "category_pages"
+
+
+class ServiceListItem(NamedTuple):
+    id: int
+    name: str
+    address: Optional[str]
+
+
+CategoryPage = tuple[list[ServiceListItem], int]
+
+
+class CategoryPageCache:
+    def __init__(self, maxsize: int, ttl: float, session_pool: async_sessionmaker, redis: Optional[Redis] = None):
+        self.ttl = ttl
+        self.session_pool = session_pool
+        self.redis = redis
+        self._pages = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Local stamps: an epoch for "every category" plus a version per category
+        self._epoch = 0
+        self._versions: dict[int, int] = {}
+        # Wall-clock times of the last invalidations, to reject shared entries loaded before them
+        self._epoch_invalidated_at = 0.0
+        self._invalidated_at: dict[int, float] = {}
+
+    def invalidate(self, key: str = "") -> None:
+        now = time.time()
+        if key:
+            category_id = int(key)
+            self._versions[category_id] = self._versions.get(category_id, 0) + 1
+            self._invalidated_at[category_id] = now
+        else:
+            self._epoch += 1
+            self._epoch_invalidated_at = now
+            self._pages.clear()
+
+    def _local_stamp(self, category_id: int) -> tuple[int, int]:
+        return self._epoch, self._versions.get(category_id, 0)
+
+    async def _shared_stamp(self, category_id: int) -> Optional[str]:
+        if self.redis is None:
+            return None
+        try:
+            epoch, version = await self.redis.mget(f"{KEY_PREFIX}:epoch", f"{KEY_PREFIX}:version:{category_id}")
+        except Exception as e:
+            print(f"Error reading category page versions: {e}")
+            return None
+        return f"{int(epoch or 0)}.{int(version or 0)}"
+
+    async def _get_shared(self, key: str, category_id: int) -> Optional[CategoryPage]:
+        try:
+            value = await self.redis.get(key)
+            if value is None:
+                return None
+            data = json.loads(value)
+            if data["loaded_at"] <= max(self._epoch_invalidated_at, self._invalidated_at.get(category_id, 0.0)):
+                return None
+            return [ServiceListItem(*item) for item in data["services"]], data["total"]
+        except Exception as e:
+            # A corrupt entry is treated as a miss and overwritten
+            print(f"Error reading shared category page: {e}")
+            return None
+
+    async def _set_shared(self, key: str, page: CategoryPage, loaded_at: float) -> None:
+        services, total = page
+        value = json.dumps(
+            {"services": [list(item) for item in services], "total": total, "loaded_at": loaded_at},
+            ensure_ascii=False,
+        )
+        try:
+            await self.redis.set(key, value, ex=int(self.ttl))
+        except Exception as e:
+            print(f"Error storing shared category page: {e}")
+
+    async def get(
+        self,
+        category_id: int,
+        page: int,
+        per_page: int,
+        load: Callable[[AsyncSession], Awaitable[CategoryPage]],
+    ) -> CategoryPage:
+        """
+        Returns the cached page, or the page returned by `load()` (given a primary session), which is then cached.
+        """
+        key = (category_id, page, per_page)
+        stamp = self._local_stamp(category_id)
+        cached = self._pages.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        # Read before loading, so a page loaded from before a change is stored under the old stamp
+        shared_stamp = await self._shared_stamp(category_id)
+        shared_key = f"{KEY_PREFIX}:{category_id}:{shared_stamp}:{page}:{per_page}"
+        value = await self._get_shared(shared_key, category_id) if shared_stamp is not None else None
+        if value is None:
+            loaded_at = time.time()
+            async with self.session_pool() as session:
+                value = await load(session)
+            if shared_stamp is not None:
+                await self._set_shared(shared_key, value, loaded_at)
+
+        # Do not keep a page that was invalidated while it was loading
+        if self._local_stamp(category_id) == stamp:
+            self._pages.set(key, (stamp, value))
+        return value
+
+    async def bump_shared(self, category_ids: list[int]) -> bool:
+        """
+        Bumps the shared stamps of the categories, or of every category if none are given.
+        Returns False if Redis could not be updated.
+        """
+        if self.redis is None:
+            return True
+        try:
+            if category_ids:
+                for category_id in category_ids:
+                    await self.redis.incr(f"{KEY_PREFIX}:version:{category_id}")
+            else:
+                await self.redis.incr(f"{KEY_PREFIX}:epoch")
+        except Exception as e:
+            # Stale entries are still rejected by their load time, and overwritten on the next view
+            print(f"Error bumping category page versions, stale shared pages will be refilled on view: {e}")
+            return False
+        return True
+
+    def stats(self) -> dict:
+        return self._pages.stats()
+
+
+category_pages = CategoryPageCache(
+    settings.CATEGORY_PAGE_CACHE_SIZE,
+    settings.CATEGORY_PAGE_CACHE_TTL,
+    async_session_maker,
+    Redis.from_url(settings.REDIS_URL) if settings.REDIS_URL else None,
+)
+invalidation.subscribe(invalidation.CATEGORY_PAGES, category_pages.invalidate)
+
+
+def _keys(category_ids: tuple[Optional[int], ...]) -> list[str]:
+    # No ids means every category
+    return [str(category_id) for category_id in sorted({i for i in category_ids if i is not None})] or [""]
+
+
+async def publish_category_pages(session: AsyncSession, *category_ids: Optional[int]) -> None:
+    """
+    Queues the invalidation of the categories' pages (of every category if none are given)
+    for other processes. It is delivered when the session's transaction commits.
+    """
+    for key in _keys(category_ids):
+        await invalidation.publish(session, invalidation.CATEGORY_PAGES, key)
+
+
+async def dispatch_category_pages(*category_ids: Optional[int]) -> None:
+    """
+    Bumps the shared stamps and invalidates the pages in the current process. Call after the commit.
+    """
+    keys = _keys(category_ids)
+    await category_pages.bump_shared([int(key) for key in keys if key])
+    for key in keys:
+        invalidation.dispatch(invalidation.CATEGORY_PAGES, key)
@@ -0,0 +1,102 @@
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import invalidation
+from app.models import Category
+
+
+class CategoryRegistry:
+    """
+    In-memory map between category names and ids.
+
+    The map is loaded once and dropped whenever the categories change (see
+    app.core.invalidation), so lookups normally cost no queries. A name that is
+    not in the map is looked up in the database, since another process may have
+    created it.
+    """
+
+    def __init__(self):
+        self._ids: Optional[dict[str, int]] = None
+        self._names: dict[int, str] = {}
+        self._version = 0
+
+    def invalidate(self, key: str = "") -> None:
+        self._ids = None
+        self._names = {}
+        self._version += 1
+
+    def _remember(self, name: str, category_id: int) -> None:
+        # The map may have been invalidated while we were waiting on the database
+        if self._ids is None:
+            return
+        self._ids[name] = category_id
+        self._names[category_id] = name
+
+    async def _load(self, session: AsyncSession) -> dict[str, int]:
+        if self._ids is None:
+            version = self._version
+            result = await session.execute(select(Category.name, Category.id))
+            rows = result.all()
+            ids = {name: category_id for name, category_id in rows}
+            # Do not keep a map that was invalidated while it was loading
+            if version != self._version:
+                return ids
+            self._ids = ids
+            self._names = {category_id: name for name, category_id in rows}
+        return self._ids
+
+    async def get_all(self, session: AsyncSession) -> dict[str, int]:
+        return dict(await self._load(session))
+
+    async def get_id(self, session: AsyncSession, name: str) -> Optional[int]:
+        ids = await self._load(session)
+        if name in ids:
+            return ids[name]
+        result = await session.execute(select(Category.id).where(Category.name == name))
+        category_id = result.scalar_one_or_none()
+        if category_id is not None:
+            self._remember(name, category_id)
+        return category_id
+
+    async def get_name(self, session: AsyncSession, category_id: int) -> Optional[str]:
+        await self._load(session)
+        if category_id in self._names:
+            return self._names[category_id]
+        result = await session.execute(select(Category.name).where(Category.id == category_id))
+        name = result.scalar_one_or_none()
+        if name is not None:
+            self._remember(name, category_id)
+        return name
+
+    async def get_or_create_id(self, session: AsyncSession, name: str) -> tuple[int, bool]:
+        """
+        Returns the id of the category, creating it if needed, and whether it was created.
+        Safe against concurrent creation.
+
+        A created category is published to the other processes in the session's transaction;
+        the caller dispatches invalidation.CATEGORIES after committing it.
+        """
+        category_id = await self.get_id(session, name)
+        if category_id is not None:
+            return category_id, False
+
+        stmt = (
+            insert(Category)
+            .values(name=name)
+            .on_conflict_do_nothing(index_elements=[Category.name])
+            .returning(Category.id)
+        )
+        category_id = (await session.execute(stmt)).scalar_one_or_none()
+        if category_id is None:
+            # Somebody else created it in the meantime
+            return await self.get_id(session, name), False
+        # Not remembered yet: the caller's transaction may still roll back
+        await invalidation.publish(session, invalidation.CATEGORIES)
+        return category_id, True
+
+
+category_registry = CategoryRegistry()
+invalidation.subscribe(invalidation.CATEGORIES, category_registry.invalidate)
@@ -1,12 +1,22 @@
-from sqlalchemy import select
+from sqlalchemy import select, func, literal, String
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from typing import Optional
+from typing import AsyncIterator, Optional
+import re
 
+from app.core import invalidation
+from app.core.metrics import timed_query
+from app.core.config import settings
 from app.models import Category, Service, MenuButton
-from app.services.maps import get_coordinates_from_address
-import asyncio
+from app.models.service import GEOCODE_PENDING
+from app.services.category_registry import category_registry
+from app.services.category_pages import (
+    CategoryPage, ServiceListItem, category_pages, dispatch_category_pages, publish_category_pages,
+)
+from app.services.geocoding_queue import geocoding_worker
+from app.services.embedding_queue import embedding_worker
 
+@timed_query
 async def get_services_by_category_name(session: AsyncSession, category_name: str) -> list[Service]:
     """
     Get all services for a given category name.
@@ -20,56 +30,146 @@ async def get_services_by_category_name(session: AsyncSession, category_name: st
     result = await session.execute(query)
     return result.scalars().all()
 
+@timed_query
+async def _load_services_page_by_category_id(
+    session: AsyncSession, category_id: int, page: int, per_page: int
+) -> CategoryPage:
+    count_query = select(func.count(Service.id)).where(Service.category_id == category_id)
+    total = (await session.execute(count_query)).scalar_one()
+    if total == 0:
+        return [], 0
+
+    query = (
+        select(Service.id, Service.name, Service.address)
+        .where(Service.category_id == category_id)
+        .order_by(Service.id)
+        .offset((page - 1) * per_page)
+        .limit(per_page)
+    )
+    result = await session.execute(query)
+    return [ServiceListItem(*row) for row in result.all()], total
+
+async def get_services_page_by_category_id(category_id: int, page: int, per_page: int) -> CategoryPage:
+    """
+    Get one page of services (id, name and address) for a given category id plus the total number
+    of services in it. Pages are cached (see app.services.category_pages); on a miss only `per_page`
+    rows are loaded, so the cost does not depend on the size of the category. Misses are loaded
+    from the primary.
+    """
+    return await category_pages.get(
+        category_id, page, per_page,
+        lambda session: _load_services_page_by_category_id(session, category_id, page, per_page),
+    )
+
+@timed_query
 async def create_service(session: AsyncSession, service_data: dict) -> Service:
     """
     Create a new service.
     """
-    # Find the category by name
-    category_name = service_data.pop("category")
-    query = select(Category).where(Category.name == category_name)
-    result = await session.execute(query)
-    category = result.scalar_one_or_none()
-
-    if not category:
-        # Or create it if it doesn't exist
-        category = Category(name=category_name)
-        session.add(category)
-        await session.flush()
+    # Find the category by name, or create it if it doesn't exist
+    category_id, category_created = await category_registry.get_or_create_id(session, service_data.pop("category"))
 
-    # Get coordinates from address
+    # Coordinates are filled in later by the background geocoder
     if service_data.get("address"):
-        try:
-            coordinates = await asyncio.wait_for(
-                asyncio.to_thread(get_coordinates_from_address, service_data["address"]),
-                timeout=5.0
-            )
-        except asyncio.TimeoutError:
-            coordinates = None
-        if coordinates:
-            service_data["latitude"], service_data["longitude"] = coordinates
+        service_data["geocode_status"] = GEOCODE_PENDING
 
-    new_service = Service(**service_data, category_id=category.id)
+    new_service = Service(**service_data, category_id=category_id)
     session.add(new_service)
+    await publish_category_pages(session, category_id)
     await session.commit()
+    if category_created:
+        invalidation.dispatch(invalidation.CATEGORIES)
+    await dispatch_category_pages(category_id)
     await session.refresh(new_service, ["category"])  # Eagerly load the category
+    if new_service.geocode_status == GEOCODE_PENDING:
+        geocoding_worker.notify()
+    embedding_worker.notify()
     return new_service
 
-async def search_services(session: AsyncSession, query: str) -> list[Service]:
+def _build_prefix_tsquery(query: str) -> tuple[str, str]:
+    """
+    Split a free-text query into words and build an OR-ed prefix tsquery from them.
+    Prefix matching stands in for the Ukrainian stemmer Postgres does not ship.
     """
-    Search for services by a query string in name and description.
+    words = [word for word in re.findall(r"\w+", query.lower()) if len(word) > 1]
+    return " | ".join(f"{word}:*" for word in words), " ".join(words)
+
+@timed_query
+async def search_services(session: AsyncSession, query: str, limit: Optional[int] = None) -> list[Service]:
     """
-    search_query = f"%{query}%"
+    Search for services by a query string in name, description and address.
+    Combines full-text matching with trigram similarity for typos and returns the best matches first.
+    """
+    ts_query_text, search_text = _build_prefix_tsquery(query)
+    if not ts_query_text:
+        return []
+
+    # Make the `<%` operator (which can use the trigram indexes) honour our threshold for this transaction
+    await session.execute(
+        select(func.set_config("pg_trgm.word_similarity_threshold", str(settings.SEARCH_SIMILARITY_THRESHOLD), True))
+    )
+
+    ts_query = func.to_tsquery("simple", ts_query_text)
+    search_literal = literal(search_text, String)
+    rank = func.ts_rank_cd(Service.search_vector, ts_query) * 2 + func.greatest(
+        func.word_similarity(search_literal, Service.name),
+        func.word_similarity(search_literal, Service.address),
+        func.word_similarity(search_literal, Service.description) * 0.5,
+    )
     stmt = (
         select(Service)
         .where(
-            (Service.name.ilike(search_query)) |
-            (Service.description.ilike(search_query))
+            Service.search_vector.op("@@")(ts_query)
+            | search_literal.op("<%")(Service.name)
+            | search_literal.op("<%")(Service.address)
+            | search_literal.op("<%")(Service.description)
         )
+        .order_by(rank.desc(), Service.id)
+        .limit(limit or settings.SEARCH_RESULTS_LIMIT)
         .options(selectinload(Service.category))
     )
     result = await session.execute(stmt)
     return result.scalars().all()
 
+@timed_query
+async def is_known_name(session: AsyncSession, text: str) -> bool:
+    """
+    Check whether the text exactly matches (case-insensitively) a category or service name.
+    """
+    # An ILIKE without wildcards is an exact match that can still use the trigram index on name
+    pattern = re.sub(r"([\\%_])", r"\\\1", text.strip())
+    category_match = select(Category.id).where(Category.name.ilike(pattern, escape="\\"))
+    service_match = select(Service.id).where(Service.name.ilike(pattern, escape="\\"))
+    query = select(category_match.exists() | service_match.exists())
+    result = await session.execute(query)
+    return result.scalar_one()
+
+@timed_query
+async def get_nearby_services(
+    session: AsyncSession,
+    latitude: float,
+    longitude: float,
+    limit: int,
+    category_id: Optional[int] = None,
+) -> list[tuple[Service, float]]:
+    """
+    Get the services closest to a point, nearest first, with their distance in meters.
+    The ordering is served by the GiST index on ll_to_earth(latitude, longitude).
+    """
+    location = func.ll_to_earth(Service.latitude, Service.longitude)
+    origin = func.ll_to_earth(latitude, longitude)
+    query = (
+        select(Service, func.earth_distance(location, origin).label("distance"))
+        .where(Service.latitude.isnot(None), Service.longitude.isnot(None))
+        .order_by(location.op("<->")(origin))
+        .limit(limit)
+    )
+    if category_id is not None:
+        query = query.where(Service.category_id == category_id)
+    result = await session.execute(query)
+    return [(service, distance) for service, distance in result.all()]
+
+@timed_query
 async def get_all_services(session: AsyncSession) -> list[Service]:
     """
     Get all services.
@@ -78,6 +178,82 @@ async def get_all_services(session: AsyncSession) -> list[Service]:
     result = await session.execute(query)
     return result.scalars().all()
 
+def _service_filters(
+    category_id: Optional[int] = None,
+    text: Optional[str] = None,
+    missing_coordinates: bool = False,
+) -> list:
+    """
+    Build the WHERE conditions shared by the admin listing and export.
+    """
+    conditions = []
+    if category_id is not None:
+        conditions.append(Service.category_id == category_id)
+    if text:
+        # Served by the trigram indexes on name and address
+        pattern = f"%{text}%"
+        conditions.append(Service.name.ilike(pattern) | Service.address.ilike(pattern))
+    if missing_coordinates:
+        conditions.append(Service.latitude.is_(None) | Service.longitude.is_(None))
+    return conditions
+
+@timed_query
+async def get_services_page(
+    session: AsyncSession,
+    limit: int,
+    after_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    **filters,
+) -> tuple[list[Service], bool]:
+    """
+    Get one page of services ordered by id using keyset pagination.
+    Pass `after_id` for the next page or `before_id` for the previous one.
+    Returns the services and whether there are more in the direction of travel.
+    """
+    query = select(Service).where(*_service_filters(**filters)).options(selectinload(Service.category))
+    if before_id is not None:
+        query = query.where(Service.id < before_id).order_by(Service.id.desc())
+    else:
+        if after_id is not None:
+            query = query.where(Service.id > after_id)
+        query = query.order_by(Service.id)
+
+    # One extra row tells whether there is another page
+    result = await session.execute(query.limit(limit + 1))
+    services = result.scalars().all()
+    has_more = len(services) > limit
+    services = services[:limit]
+    if before_id is not None:
+        services.reverse()
+    return services, has_more
+
+async def stream_services(session: AsyncSession, **filters) -> AsyncIterator[Service]:
+    """
+    Stream services ordered by id from a server-side cursor, without loading them all into memory.
+    """
+    query = (
+        select(Service)
+        .where(*_service_filters(**filters))
+        .order_by(Service.id)
+        .options(selectinload(Service.category))
+        .execution_options(yield_per=500)
+    )
+    result = await session.stream_scalars(query)
+    async for service in result:
+        yield service
+
+@timed_query
+async def get_services_by_ids(session: AsyncSession, service_ids: list[int]) -> list[Service]:
+    """
+    Get services by their IDs, in the order given. IDs of deleted services are skipped.
+    """
+    if not service_ids:
+        return []
+    query = select(Service).where(Service.id.in_(service_ids)).options(selectinload(Service.category))
+    services = {service.id: service for service in (await session.execute(query)).scalars()}
+    return [services[service_id] for service_id in service_ids if service_id in services]
+
+@timed_query
 async def get_service_by_id(session: AsyncSession, service_id: int) -> Optional[Service]:
     """
     Get a service by its ID.
@@ -86,46 +262,45 @@ async def get_service_by_id(session: AsyncSession, service_id: int) -> Optional[
     result = await session.execute(query)
     return result.scalar_one_or_none()
 
+@timed_query
 async def update_service(session: AsyncSession, service_id: int, service_data: dict) -> Optional[Service]:
     """
     Update a service.
     """
     service = await get_service_by_id(session, service_id)
     if service:
+        old_category_id = service.category_id
+        category_created = False
         # Handle category update
         if "category" in service_data:
-            category_name = service_data.pop("category")
-            query = select(Category).where(Category.name == category_name)
-            result = await session.execute(query)
-            category = result.scalar_one_or_none()
-            if not category:
-                category = Category(name=category_name)
-                session.add(category)
-                await session.flush()
-            service.category_id = category.id
-
-        # Get coordinates from address if address is updated
-        if "address" in service_data and service_data["address"] != service.address:
-             try:
-                coordinates = await asyncio.wait_for(
-                    asyncio.to_thread(get_coordinates_from_address, service_data["address"]),
-                    timeout=5.0
-                )
-             except asyncio.TimeoutError:
-                coordinates = None
-             if coordinates:
-                service_data["latitude"], service_data["longitude"] = coordinates
-             else:
-                service_data["latitude"], service_data["longitude"] = None, None
+            service.category_id, category_created = await category_registry.get_or_create_id(
+                session, service_data.pop("category")
+            )
 
+        # Drop stale coordinates if the address changed, the background geocoder fills in new ones
+        address_changed = "address" in service_data and service_data["address"] != service.address
+        if address_changed:
+            service_data["latitude"], service_data["longitude"] = None, None
+            service_data["geocode_status"] = GEOCODE_PENDING if service_data["address"] else None
+            service_data["geocode_claimed_at"] = None
 
         for key, value in service_data.items():
             setattr(service, key, value)
-        
+
+        await invalidation.publish(session, invalidation.SERVICES, str(service_id))
+        await publish_category_pages(session, old_category_id, service.category_id)
         await session.commit()
+        invalidation.dispatch(invalidation.SERVICES, str(service_id))
+        if category_created:
+            invalidation.dispatch(invalidation.CATEGORIES)
+        await dispatch_category_pages(old_category_id, service.category_id)
         await session.refresh(service, ["category"])
+        if address_changed and service.geocode_status == GEOCODE_PENDING:
+            geocoding_worker.notify()
+        embedding_worker.notify()
     return service
 
+@timed_query
 async def delete_service(session: AsyncSession, service_id: int) -> bool:
     """
     Delete a service.
@@ -133,10 +308,15 @@ async def delete_service(session: AsyncSession, service_id: int) -> bool:
     service = await get_service_by_id(session, service_id)
     if service:
         await session.delete(service)
+        await invalidation.publish(session, invalidation.SERVICES, str(service_id))
+        await publish_category_pages(session, service.category_id)
         await session.commit()
+        invalidation.dispatch(invalidation.SERVICES, str(service_id))
+        await dispatch_category_pages(service.category_id)
         return True
     return False
 
+@timed_query
 async def get_all_menu_buttons(session: AsyncSession) -> list[MenuButton]:
     """
     Get all menu buttons.
@@ -145,16 +325,20 @@ async def get_all_menu_buttons(session: AsyncSession) -> list[MenuButton]:
     result = await session.execute(query)
     return result.scalars().all()
 
+@timed_query
 async def create_menu_button(session: AsyncSession, button_data: dict) -> MenuButton:
     """
     Create a new menu button.
     """
     new_button = MenuButton(**button_data)
     session.add(new_button)
+    await invalidation.publish(session, invalidation.MENU)
     await session.commit()
+    invalidation.dispatch(invalidation.MENU)
     await session.refresh(new_button)
     return new_button
 
+@timed_query
 async def get_menu_button_by_id(session: AsyncSession, button_id: int) -> Optional[MenuButton]:
     """
     Get a menu button by its ID.
@@ -163,6 +347,7 @@ async def get_menu_button_by_id(session: AsyncSession, button_id: int) -> Option
     result = await session.execute(query)
     return result.scalar_one_or_none()
 
+@timed_query
 async def update_menu_button(session: AsyncSession, button_id: int, button_data: dict) -> Optional[MenuButton]:
     """
     Update a menu button.
@@ -171,10 +356,13 @@ async def update_menu_button(session: AsyncSession, button_id: int, button_data:
     if button:
         for key, value in button_data.items():
             setattr(button, key, value)
+        await invalidation.publish(session, invalidation.MENU)
         await session.commit()
+        invalidation.dispatch(invalidation.MENU)
         await session.refresh(button)
     return button
 
+@timed_query
 async def delete_menu_button(session: AsyncSession, button_id: int) -> bool:
     """
     Delete a menu button.
@@ -182,10 +370,13 @@ async def delete_menu_button(session: AsyncSession, button_id: int) -> bool:
     button = await get_menu_button_by_id(session, button_id)
     if button:
         await session.delete(button)
+        await invalidation.publish(session, invalidation.MENU)
         await session.commit()
+        invalidation.dispatch(invalidation.MENU)
         return True
     return False
 
+@timed_query
 async def get_all_categories(session: AsyncSession) -> list[Category]:
     """
     Get all categories.
@@ -194,16 +385,20 @@ async def get_all_categories(session: AsyncSession) -> list[Category]:
     result = await session.execute(query)
     return result.scalars().all()
 
+@timed_query
 async def create_category(session: AsyncSession, category_data: dict) -> Category:
     """
     Create a new category.
     """
     new_category = Category(**category_data)
     session.add(new_category)
+    await invalidation.publish(session, invalidation.CATEGORIES)
     await session.commit()
+    invalidation.dispatch(invalidation.CATEGORIES)
     await session.refresh(new_category)
     return new_category
 
+@timed_query
 async def get_category_by_id(session: AsyncSession, category_id: int) -> Optional[Category]:
     """
     Get a category by its ID.
@@ -212,6 +407,7 @@ async def get_category_by_id(session: AsyncSession, category_id: int) -> Optiona
     result = await session.execute(query)
     return result.scalar_one_or_none()
 
+@timed_query
 async def update_category(session: AsyncSession, category_id: int, category_data: dict) -> Optional[Category]:
     """
     Update a category.
@@ -220,10 +416,15 @@ async def update_category(session: AsyncSession, category_id: int, category_data
     if category:
         for key, value in category_data.items():
             setattr(category, key, value)
+        await invalidation.publish(session, invalidation.CATEGORIES)
+        await publish_category_pages(session, category_id)
         await session.commit()
+        invalidation.dispatch(invalidation.CATEGORIES)
+        await dispatch_category_pages(category_id)
         await session.refresh(category)
     return category
 
+@timed_query
 async def delete_category(session: AsyncSession, category_id: int) -> bool:
     """
     Delete a category.
@@ -231,6 +432,10 @@ async def delete_category(session: AsyncSession, category_id: int) -> bool:
     category = await get_category_by_id(session, category_id)
     if category:
         await session.delete(category)
+        await invalidation.publish(session, invalidation.CATEGORIES)
+        await publish_category_pages(session, category_id)
         await session.commit()
+        invalidation.dispatch(invalidation.CATEGORIES)
+        await dispatch_category_pages(category_id)
         return True
     return False
\ No newline at end of file
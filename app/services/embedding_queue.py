@@ -0,0 +1,189 @@
+"""
+Background computation of service embeddings for semantic search.
+
+Every service has an embedding of its name, category, description and address in
+service_embeddings. The worker embeds the services changed since they were last embedded,
+a batch per API request. Like the geocoder, the queue is the database itself: writers call
+`embedding_worker.notify()` to wake the worker, which otherwise polls.
+"""
+import asyncio
+import hashlib
+from typing import Optional
+
+import numpy as np
+import openai
+from sqlalchemy import DateTime, Integer, LargeBinary, String, column, or_, select, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import selectinload
+
+from app.core import invalidation
+from app.core.config import settings
+from app.core.db import async_session_maker
+from app.models import Service, ServiceEmbedding
+from app.services.ai import get_embeddings
+
+
+def embedding_model_key() -> str:
+    # Vectors of different models or sizes are not comparable
+    return f"{settings.EMBEDDING_MODEL}:{settings.EMBEDDING_DIMENSIONS}"
+
+
+def service_text(service: Service) -> str:
+    parts = [service.name, service.category.name if service.category else None, service.description, service.address]
+    return "\n".join(part for part in parts if part)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(f"{embedding_model_key()}:{text}".encode()).hexdigest()
+
+
+class EmbeddingWorker:
+    """
+    Embeds services that have no embedding yet or changed since they were embedded.
+    Structured like GeocodingWorker: the queue is the database itself.
+
+    A batch is read and embedded without holding row locks or a connection. Embeddings are
+    only written for services that still have the updated_at that was embedded, so a service
+    edited or deleted meanwhile is left for the next batch. Workers in several processes may
+    embed the same services at the same time; the write-back makes that harmless.
+
+    A service whose text the API rejects gets an empty embedding, which search skips, so it
+    does not block the services after it. It is embedded again once the service changes.
+    """
+
+    def __init__(self, session_pool: async_sessionmaker, batch_size: int, poll_interval: float):
+        self.session_pool = session_pool
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.drain()
+            except Exception as e:
+                print(f"Error in embedding worker: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def drain(self) -> int:
+        """
+        Embeds stale services batch by batch until none are left. Returns the number processed.
+        """
+        total = 0
+        while True:
+            processed = await self._process_batch()
+            total += processed
+            if processed < self.batch_size:
+                return total
+
+    async def _embed(self, texts: dict[int, str]) -> dict[int, bytes]:
+        """
+        Embeds the texts, returning normalized float32 vectors by service id. If the API rejects
+        the batch, the texts are embedded one by one and the rejected ones get an empty vector.
+        """
+        if not texts:
+            return {}
+        try:
+            vectors = dict(zip(texts, await get_embeddings(list(texts.values()))))
+        except openai.BadRequestError as e:
+            if len(texts) == 1:
+                service_id = next(iter(texts))
+                print(f"Error embedding service {service_id}, skipping it until it changes: {e}")
+                return {service_id: b""}
+            result = {}
+            for service_id, text in texts.items():
+                result.update(await self._embed({service_id: text}))
+            return result
+
+        result = {}
+        for service_id, vector in vectors.items():
+            vector = np.asarray(vector, dtype=np.float32)
+            vector /= np.linalg.norm(vector) or 1
+            result[service_id] = vector.tobytes()
+        return result
+
+    async def _process_batch(self) -> int:
+        async with self.session_pool() as session:
+            query = (
+                select(Service, ServiceEmbedding)
+                .outerjoin(ServiceEmbedding, ServiceEmbedding.service_id == Service.id)
+                .where(or_(
+                    ServiceEmbedding.service_id.is_(None),
+                    ServiceEmbedding.model != embedding_model_key(),
+                    ServiceEmbedding.service_updated_at != Service.updated_at,
+                ))
+                .order_by(Service.id)
+                .limit(self.batch_size)
+                .options(selectinload(Service.category))
+            )
+            rows = (await session.execute(query)).all()
+        if not rows:
+            return 0
+
+        texts = {service.id: service_text(service) for service, _ in rows}
+        # Edits that do not touch the embedded text (e.g. geocoding) need no new embedding
+        vectors = await self._embed({
+            service.id: texts[service.id] for service, embedding in rows
+            if embedding is None or embedding.content_hash != content_hash(texts[service.id])
+        })
+
+        data = []
+        for service, embedding in rows:
+            blob = vectors[service.id] if service.id in vectors else embedding.embedding
+            data.append((service.id, embedding_model_key(), content_hash(texts[service.id]), blob, service.updated_at))
+        batch = values(
+            column("service_id", Integer),
+            column("model", String),
+            column("content_hash", String),
+            column("embedding", LargeBinary),
+            column("service_updated_at", DateTime(timezone=True)),
+            name="batch",
+        ).data(data)
+        columns = ["service_id", "model", "content_hash", "embedding", "service_updated_at"]
+        # Skip services that were edited or deleted while the batch was being embedded
+        source = select(*batch.c).join(
+            Service, (Service.id == batch.c.service_id) & (Service.updated_at == batch.c.service_updated_at)
+        )
+        stmt = insert(ServiceEmbedding).from_select(columns, source)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ServiceEmbedding.service_id],
+            set_={name: stmt.excluded[name] for name in columns[1:]},
+            # Another worker may have written the same version already
+            where=ServiceEmbedding.service_updated_at.is_distinct_from(stmt.excluded.service_updated_at),
+        )
+        async with self.session_pool() as session:
+            written = (await session.execute(stmt)).rowcount
+            if vectors and written:
+                await invalidation.publish(session, invalidation.EMBEDDINGS)
+            await session.commit()
+        if vectors and written:
+            invalidation.dispatch(invalidation.EMBEDDINGS)
+        return len(rows)
+
+embedding_worker = EmbeddingWorker(
+    async_session_maker,
+    batch_size=settings.EMBEDDING_BATCH_SIZE,
+    poll_interval=settings.EMBEDDING_POLL_INTERVAL,
+)
@@ -0,0 +1,99 @@
+"""
+Semantic search over services.
+
+Queries are answered from an in-process matrix of the normalized service embeddings (kept
+up to date by app.services.embedding_queue): cosine similarity is then a single
+matrix-vector product. The matrix is reloaded after the embeddings change.
+"""
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import invalidation
+from app.core.config import settings
+from app.models import Service, ServiceEmbedding
+from app.services import crud
+from app.services.ai import get_query_embedding
+from app.services.embedding_queue import embedding_model_key
+
+# Reciprocal rank fusion constant; dampens the difference between the very first ranks
+RANK_CONSTANT = 60
+
+
+class EmbeddingIndex:
+    """
+    Normalized service embeddings in memory, for top-k cosine similarity by dot product.
+    """
+
+    def __init__(self):
+        self._ids: Optional[np.ndarray] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._version = 0
+
+    def invalidate(self, key: str = "") -> None:
+        self._ids = None
+        self._matrix = None
+        self._version += 1
+
+    async def _load(self, session: AsyncSession) -> tuple[np.ndarray, np.ndarray]:
+        if self._matrix is None:
+            version = self._version
+            result = await session.execute(
+                select(ServiceEmbedding.service_id, ServiceEmbedding.embedding)
+                .where(ServiceEmbedding.model == embedding_model_key(), func.length(ServiceEmbedding.embedding) > 0)
+            )
+            rows = result.all()
+            ids = np.array([service_id for service_id, _ in rows], dtype=np.int64)
+            matrix = np.array([np.frombuffer(embedding, dtype=np.float32) for _, embedding in rows], dtype=np.float32)
+            matrix = matrix.reshape(len(rows), settings.EMBEDDING_DIMENSIONS)
+            # Vectors are stored normalized, normalizing again only guards against other writers
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1, norms)
+            # Do not keep a matrix that was invalidated while it was loading
+            if version != self._version:
+                return ids, matrix
+            self._ids, self._matrix = ids, matrix
+        return self._ids, self._matrix
+
+    async def search(self, session: AsyncSession, query_vector: list[float], k: int) -> list[tuple[int, float]]:
+        """
+        Returns up to k (service id, cosine similarity) pairs, most similar first.
+        """
+        ids, matrix = await self._load(session)
+        if not len(ids):
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        scores = matrix @ (query / (np.linalg.norm(query) or 1))
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top if scores[i] >= settings.SEMANTIC_MIN_SIMILARITY]
+
+
+embedding_index = EmbeddingIndex()
+invalidation.subscribe(invalidation.EMBEDDINGS, embedding_index.invalidate)
+
+
+async def semantic_search_services(session: AsyncSession, text: str, limit: Optional[int] = None) -> Optional[list[Service]]:
+    """
+    Searches services by meaning, blending in the keyword rank with SEMANTIC_KEYWORD_WEIGHT.
+    Returns None if the query could not be embedded, so the caller can fall back to keyword search.
+    """
+    limit = limit or settings.SEARCH_RESULTS_LIMIT
+    query_vector = await get_query_embedding(text)
+    if query_vector is None:
+        return None
+
+    # Weighted reciprocal rank fusion: only the ranks matter, so the scores need no calibration
+    weight = settings.SEMANTIC_KEYWORD_WEIGHT
+    scores: dict[int, float] = {}
+    for rank, (service_id, _) in enumerate(await embedding_index.search(session, query_vector, limit), start=1):
+        scores[service_id] = (1 - weight) / (RANK_CONSTANT + rank)
+    if weight > 0:
+        for rank, service in enumerate(await crud.search_services(session, text, limit), start=1):
+            scores[service.id] = scores.get(service.id, 0.0) + weight / (RANK_CONSTANT + rank)
+
+    ranked = sorted(scores, key=lambda service_id: (-scores[service_id], service_id))[:limit]
+    return await crud.get_services_by_ids(session, ranked)
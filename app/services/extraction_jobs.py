@@ -0,0 +1,143 @@
+"""
+Background AI extraction jobs.
+
+`/process-text/jobs` queues raw text here and returns a job id right away. A fixed number
+of worker tasks run `get_service_data_from_text` on queued jobs, so bursts of slow
+extractions neither tie up HTTP requests nor exceed EXTRACTION_JOB_CONCURRENCY. Clients
+poll the job or follow it over server-sent events.
+
+Jobs live in the memory of the process that accepted them and expire EXTRACTION_JOB_TTL
+seconds after they were last touched.
+
+Other long-running admin work, such as bulk imports, is submitted with `submit_task()` and
+tracked the same way. Such a job takes one worker until it finishes.
+"""
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from app.core.config import settings
+from app.services.ai import get_service_data_from_text
+from app.services.cache import TTLCache
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+@dataclass
+class ExtractionJob:
+    text: Optional[str] = None
+    # Runs instead of the AI extraction and returns the result, see ExtractionJobQueue.submit_task
+    run: Optional[Callable[[], Awaitable[dict]]] = field(default=None, repr=False)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = JOB_QUEUED
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    # Replaced on every status change, so waiters wake up once per change
+    changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+    def set_status(self, status: str) -> None:
+        self.status = status
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def as_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+        }
+
+
+class ExtractionJobQueue:
+    def __init__(self, concurrency: int, queue_size: int, ttl: float):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        # Until a job finishes, at most one full queue of submissions and one of completions
+        # are stored after it, so room for both keeps unfinished jobs from being evicted
+        self._jobs = TTLCache(maxsize=2 * (queue_size + concurrency), ttl=ttl)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        if not self._workers:
+            # Created here so it binds to the running event loop
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._workers = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, text: str) -> Optional[ExtractionJob]:
+        """
+        Queues a job. Returns None if the queue is full.
+        """
+        return self._submit(ExtractionJob(text=text))
+
+    def submit_task(self, run: Callable[[], Awaitable[dict]]) -> Optional[ExtractionJob]:
+        """
+        Queues a job whose result is the dict returned by `run()`. Returns None if the queue is full.
+        """
+        return self._submit(ExtractionJob(run=run))
+
+    def _submit(self, job: ExtractionJob) -> Optional[ExtractionJob]:
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            return None
+        self._jobs.set(job.id, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ExtractionJob]:
+        return self._jobs.get(job_id)
+
+    async def _run(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.set_status(JOB_RUNNING)
+            if job.run is not None:
+                try:
+                    job.result = await job.run()
+                    job.set_status(JOB_DONE)
+                except Exception as e:
+                    print(f"Error in job {job.id}: {e}")
+                    job.error = str(e)
+                    job.set_status(JOB_FAILED)
+                # Do not keep the work (e.g. a whole import file) alive with the finished job
+                job.run = None
+            else:
+                try:
+                    service_data = await get_service_data_from_text(job.text)
+                except Exception as e:
+                    print(f"Error in extraction job {job.id}: {e}")
+                    service_data = None
+                if service_data:
+                    job.result = service_data.model_dump()
+                    job.set_status(JOB_DONE)
+                else:
+                    job.error = "Failed to process text with AI"
+                    job.set_status(JOB_FAILED)
+            # Keep the finished job around for a full TTL from now
+            self._jobs.set(job.id, job)
+            self._queue.task_done()
+
+
+extraction_jobs = ExtractionJobQueue(
+    settings.EXTRACTION_JOB_CONCURRENCY,
+    settings.EXTRACTION_JOB_QUEUE_SIZE,
+    settings.EXTRACTION_JOB_TTL,
+)
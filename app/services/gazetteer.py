@@ -0,0 +1,88 @@
+"""
+Offline gazetteer of Snovsk streets.
+
+The gazetteer is a JSON file (settings.GAZETTEER_PATH) with known coordinates for some
+house numbers on each street:
+
+    {
+        "streets": [
+            {
+                "name": "Центральна",
+                "aliases": ["Леніна"],
+                "houses": [
+                    {"number": 1, "lat": 51.0, "lng": 31.0},
+                    {"number": 99, "lat": 51.1, "lng": 31.1}
+                ]
+            }
+        ]
+    }
+
+Coordinates for numbers between two known houses are interpolated linearly.
+"""
+import bisect
+import json
+import re
+from typing import Optional, Tuple
+
+# Street type words and the town name carry no information for the lookup
+_NOISE_RE = re.compile(
+    r"\b(вулиця|вул|провулок|пров|проспект|просп|пр|площа|пл|бульвар|бул|місто|м|сновськ|чернігівська|обл|область|україна)\b\.?",
+)
+_HOUSE_NUMBER_RE = re.compile(r"\b(\d+)\s*[а-яґєії]?\b")
+
+
+def normalize_street(name: str) -> str:
+    name = _NOISE_RE.sub(" ", name.lower().replace("’", "'"))
+    return " ".join(re.findall(r"[\w'-]+", name))
+
+
+def parse_address(address: str) -> Tuple[str, Optional[int]]:
+    """
+    Splits an address like "вул. Центральна, 10а" into a normalized street name and a house number.
+    """
+    match = _HOUSE_NUMBER_RE.search(address.lower())
+    number = int(match.group(1)) if match else None
+    street = _HOUSE_NUMBER_RE.sub(" ", address.lower())
+    return normalize_street(street), number
+
+
+class Gazetteer:
+    def __init__(self, streets: list[dict]):
+        # street name -> (sorted house numbers, matching coordinates)
+        self._streets: dict[str, tuple[list[int], list[Tuple[float, float]]]] = {}
+        for street in streets:
+            houses = sorted(street["houses"], key=lambda house: house["number"])
+            index = ([house["number"] for house in houses], [(house["lat"], house["lng"]) for house in houses])
+            for name in [street["name"], *street.get("aliases", [])]:
+                self._streets[normalize_street(name)] = index
+
+    @classmethod
+    def from_file(cls, path: str) -> "Gazetteer":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["streets"])
+
+    def lookup(self, address: str) -> Optional[Tuple[float, float]]:
+        """
+        Resolves an address to coordinates without any network calls, or returns None if the street is unknown.
+        """
+        street, number = parse_address(address)
+        index = self._streets.get(street)
+        if not index or not index[0]:
+            return None
+        numbers, points = index
+
+        # Without a house number fall back to the middle of the street
+        if number is None:
+            return points[len(points) // 2]
+        if number <= numbers[0]:
+            return points[0]
+        if number >= numbers[-1]:
+            return points[-1]
+
+        right = bisect.bisect_left(numbers, number)
+        if numbers[right] == number:
+            return points[right]
+        left = right - 1
+        ratio = (number - numbers[left]) / (numbers[right] - numbers[left])
+        (lat1, lng1), (lat2, lng2) = points[left], points[right]
+        return lat1 + (lat2 - lat1) * ratio, lng1 + (lng2 - lng1) * ratio
@@ -0,0 +1,175 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core import invalidation
+from app.core.config import settings
+from app.core.db import async_session_maker
+from app.models.service import Service, GEOCODE_PENDING, GEOCODE_DONE, GEOCODE_FAILED
+from app.services.maps import geocode_address, GeocodingError
+
+
+class GeocodingWorker:
+    """
+    Fills in coordinates for services whose geocode_status is "pending".
+
+    The pending state lives in the database, so work survives restarts and any process
+    running a worker (bot or web) can pick it up. Writers call notify() to wake the worker
+    right away; otherwise it polls every `poll_interval` seconds.
+
+    A batch is claimed in a short transaction of its own and geocoded without holding row
+    locks or a connection. Results are only written back to rows that are still claimed by
+    this batch and still have the address that was geocoded. A claim left behind by a worker
+    that died expires after `claim_timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker,
+        batch_size: int,
+        requests_per_second: float,
+        poll_interval: float,
+        claim_timeout: float,
+    ):
+        self.session_pool = session_pool
+        self.batch_size = batch_size
+        self.min_interval = 1.0 / requests_per_second
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.drain()
+            except Exception as e:
+                print(f"Error in geocoding worker: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def drain(self) -> int:
+        """
+        Processes pending services batch by batch until none are left. Returns the number geocoded.
+        """
+        total = 0
+        while True:
+            processed, retry_later = await self._process_batch()
+            total += processed
+            if processed < self.batch_size or retry_later:
+                return total
+
+    async def _claim_batch(self) -> tuple[list[tuple[int, Optional[str]]], datetime]:
+        """
+        Claims up to batch_size pending services. Returns their ids and addresses, and the claim time.
+        """
+        claimed_at = datetime.now(timezone.utc)
+        async with self.session_pool() as session:
+            # SKIP LOCKED lets workers in several processes claim batches at the same time
+            query = (
+                select(Service.id, Service.address)
+                .where(
+                    Service.geocode_status == GEOCODE_PENDING,
+                    Service.geocode_claimed_at.is_(None)
+                    | (Service.geocode_claimed_at < func.now() - timedelta(seconds=self.claim_timeout)),
+                )
+                .order_by(Service.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = (await session.execute(query)).all()
+            if rows:
+                await session.execute(
+                    update(Service)
+                    .where(Service.id.in_([service_id for service_id, _ in rows]))
+                    # A claim is not a change to the service, so keep updated_at
+                    .values(geocode_claimed_at=claimed_at, updated_at=Service.updated_at)
+                )
+                await session.commit()
+        return [tuple(row) for row in rows], claimed_at
+
+    async def _process_batch(self) -> tuple[int, bool]:
+        batch, claimed_at = await self._claim_batch()
+
+        # Service id -> (geocoded address, new column values)
+        results: dict[int, tuple[Optional[str], dict]] = {}
+        retry_later = False
+        for service_id, address in batch:
+            if not address:
+                results[service_id] = (address, {"geocode_status": None})
+                continue
+            try:
+                coordinates, called_google = await geocode_address(self.session_pool, address)
+            except GeocodingError as e:
+                # Leave the rest pending and back off until the next poll
+                print(e)
+                retry_later = True
+                break
+            if coordinates:
+                latitude, longitude = coordinates
+                results[service_id] = (address, {"latitude": latitude, "longitude": longitude, "geocode_status": GEOCODE_DONE})
+            else:
+                results[service_id] = (address, {"geocode_status": GEOCODE_FAILED})
+            # Only Google requests are rate limited, cache and gazetteer hits need no pause
+            if called_google:
+                await asyncio.sleep(self.min_interval)
+
+        if not batch:
+            return 0, retry_later
+
+        async with self.session_pool() as session:
+            still_claimed = [Service.geocode_claimed_at == claimed_at, Service.geocode_status == GEOCODE_PENDING]
+            # Services whose cached detail cards now lack the map button
+            located: list[int] = []
+            for service_id, (address, values) in results.items():
+                result = await session.execute(
+                    update(Service)
+                    .where(Service.id == service_id, Service.address.is_not_distinct_from(address), *still_claimed)
+                    .values(**values, geocode_claimed_at=None)
+                )
+                if result.rowcount and values.get("geocode_status") == GEOCODE_DONE:
+                    await invalidation.publish(session, invalidation.SERVICES, str(service_id))
+                    located.append(service_id)
+            # Release what was not geocoded, so the next poll can claim it right away
+            unprocessed = [service_id for service_id, _ in batch if service_id not in results]
+            if unprocessed:
+                await session.execute(
+                    update(Service)
+                    .where(Service.id.in_(unprocessed), *still_claimed)
+                    .values(geocode_claimed_at=None, updated_at=Service.updated_at)
+                )
+            await session.commit()
+        for service_id in located:
+            invalidation.dispatch(invalidation.SERVICES, str(service_id))
+        return len(results), retry_later
+
+
+geocoding_worker = GeocodingWorker(
+    async_session_maker,
+    batch_size=settings.GEOCODE_BATCH_SIZE,
+    requests_per_second=settings.GEOCODE_REQUESTS_PER_SECOND,
+    poll_interval=settings.GEOCODE_POLL_INTERVAL,
+    claim_timeout=settings.GEOCODE_CLAIM_TIMEOUT,
+)
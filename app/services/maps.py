@@ -1,19 +1,107 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
 import googlemaps
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from app.core.config import settings
+from app.core.metrics import track_external
+from app.models import GeocodeCache
+from app.services.gazetteer import Gazetteer
 from typing import Optional, Tuple
 
 gmaps = googlemaps.Client(key=settings.GOOGLE_MAPS_API_KEY)
+gazetteer = Gazetteer.from_file(settings.GAZETTEER_PATH) if settings.GAZETTEER_PATH else None
+
+class GeocodingError(Exception):
+    """
+    Raised when the geocoder times out or fails, as opposed to finding nothing.
+    """
+
+def _google_geocode(address: str) -> Optional[Tuple[float, float]]:
+    """
+    Geocodes an address with Google. Returns None if nothing was found and raises on API errors.
+    """
+    geocode_result = gmaps.geocode(address)
+    if geocode_result:
+        location = geocode_result[0]['geometry']['location']
+        return location['lat'], location['lng']
+    return None
 
 def get_coordinates_from_address(address: str) -> Optional[Tuple[float, float]]:
     """
     Geocodes an address and returns latitude and longitude.
     """
     try:
-        geocode_result = gmaps.geocode(address)
-        if geocode_result:
-            location = geocode_result[0]['geometry']['location']
-            return location['lat'], location['lng']
+        with track_external("google_geocoder", "geocode"):
+            return _google_geocode(address)
     except Exception as e:
         print(f"Error geocoding address '{address}': {e}")
-    
-    return None
\ No newline at end of file
+
+    return None
+
+def normalize_address(address: str) -> str:
+    """
+    Normalizes an address for use as a geocode cache key.
+    """
+    return " ".join(address.lower().replace(",", " ").split())[:255]
+
+async def geocode_address(session_pool: async_sessionmaker, address: str) -> Tuple[Optional[Tuple[float, float]], bool]:
+    """
+    Resolves an address through the geocode cache, then the local gazetteer, then Google.
+    Returns the coordinates (None if nothing was found) and whether Google was called.
+    Google results (including "not found") are written to the cache; a "not found" expires after
+    GEOCODE_NEGATIVE_TTL. No connection is held while Google is called. Raises GeocodingError if
+    Google could not be reached.
+    """
+    key = normalize_address(address)
+    async with session_pool() as session:
+        result = await session.execute(select(GeocodeCache).where(GeocodeCache.address == key))
+        cached = result.scalar_one_or_none()
+    if cached:
+        if cached.latitude is not None and cached.longitude is not None:
+            return (cached.latitude, cached.longitude), False
+        if cached.created_at > datetime.now(timezone.utc) - timedelta(seconds=settings.GEOCODE_NEGATIVE_TTL):
+            return None, False
+
+    if gazetteer:
+        coordinates = gazetteer.lookup(address)
+        if coordinates:
+            return coordinates, False
+
+    # Timeouts and API errors are not cached, so the caller can retry the address later
+    try:
+        with track_external("google_geocoder", "geocode"):
+            coordinates = await asyncio.wait_for(
+                asyncio.to_thread(_google_geocode, address),
+                timeout=settings.GEOCODE_TIMEOUT
+            )
+    except asyncio.TimeoutError as e:
+        raise GeocodingError(f"Timed out geocoding address '{address}'") from e
+    except Exception as e:
+        raise GeocodingError(f"Error geocoding address '{address}': {e}") from e
+
+    latitude, longitude = coordinates if coordinates else (None, None)
+    async with session_pool() as session:
+        stmt = insert(GeocodeCache).values(address=key, latitude=latitude, longitude=longitude, source="google")
+        # Replace an expired miss; a hit stored meanwhile by another worker is kept
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[GeocodeCache.address],
+            set_={"latitude": latitude, "longitude": longitude, "source": "google", "created_at": func.now()},
+            where=GeocodeCache.latitude.is_(None),
+        )
+        await session.execute(stmt)
+        await session.commit()
+    return coordinates, True
+
+async def forget_misses(session: AsyncSession, addresses: list[str]) -> int:
+    """
+    Drops the cached "not found" results for the addresses, so they are sent to Google again.
+    """
+    keys = list({normalize_address(address) for address in addresses})
+    if not keys:
+        return 0
+    result = await session.execute(
+        delete(GeocodeCache).where(GeocodeCache.address.in_(keys), GeocodeCache.latitude.is_(None))
+    )
+    return result.rowcount
@@ -0,0 +1,138 @@
+"""
+Speech-to-text pipeline for voice messages.
+
+Telegram voice notes (OGG/Opus) are decoded by an ffmpeg subprocess straight into
+16 kHz mono 16-bit PCM and passed to the configured recognizer backend:
+
+- "google": Google Web Speech API through SpeechRecognition (network bound, runs in a thread)
+- "vosk":   offline Vosk recognizer for CPU-only boxes (CPU bound, runs in a process pool).
+            Needs `pip install vosk` and a model unpacked at VOSK_MODEL_PATH.
+
+The number of voice messages processed at once is bounded by STT_MAX_CONCURRENCY.
+Stage latencies are recorded in the external_call_duration_seconds metric
+(service "ffmpeg" and "stt").
+"""
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Protocol
+
+import speech_recognition as sr
+
+from app.core.config import settings
+from app.core.metrics import track_external
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # bytes, signed 16-bit little endian
+
+
+class SpeechBackend(Protocol):
+    async def recognize(self, pcm: bytes) -> Optional[str]: ...
+
+
+class GoogleSpeechBackend:
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def _recognize(self, pcm: bytes) -> Optional[str]:
+        audio_data = sr.AudioData(pcm, SAMPLE_RATE, SAMPLE_WIDTH)
+        try:
+            return self.recognizer.recognize_google(audio_data, language="uk-UA")
+        except sr.UnknownValueError:
+            print("Google Web Speech API could not understand the audio")
+        except sr.RequestError as e:
+            print(f"Could not request results from Google Web Speech API; {e}")
+        return None
+
+    async def recognize(self, pcm: bytes) -> Optional[str]:
+        return await asyncio.to_thread(self._recognize, pcm)
+
+
+# Loaded once per worker process by the pool initializer
+_vosk_model = None
+
+def _init_vosk_worker(model_path: str) -> None:
+    global _vosk_model
+    from vosk import Model, SetLogLevel
+    SetLogLevel(-1)
+    _vosk_model = Model(model_path)
+
+def _vosk_recognize(pcm: bytes) -> Optional[str]:
+    from vosk import KaldiRecognizer
+    recognizer = KaldiRecognizer(_vosk_model, SAMPLE_RATE)
+    recognizer.AcceptWaveform(pcm)
+    text = json.loads(recognizer.FinalResult()).get("text")
+    return text or None
+
+
+class VoskSpeechBackend:
+    def __init__(self, model_path: str, workers: int):
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_vosk_worker, initargs=(model_path,))
+
+    async def recognize(self, pcm: bytes) -> Optional[str]:
+        return await asyncio.get_running_loop().run_in_executor(self.pool, _vosk_recognize, pcm)
+
+
+async def decode_to_pcm(audio_bytes: bytes, timeout: float) -> bytes:
+    """
+    Decodes OGG/Opus audio to 16 kHz mono 16-bit PCM with an ffmpeg subprocess.
+    Raises asyncio.TimeoutError after `timeout` seconds; the subprocess is killed on timeout or cancellation.
+    """
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "pipe:1",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        pcm, error = await asyncio.wait_for(process.communicate(audio_bytes), timeout=timeout)
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {error.decode(errors='replace').strip()}")
+    return pcm
+
+
+def _create_backend() -> SpeechBackend:
+    if settings.STT_BACKEND == "vosk":
+        if not settings.VOSK_MODEL_PATH:
+            raise RuntimeError("STT_BACKEND=vosk requires VOSK_MODEL_PATH")
+        return VoskSpeechBackend(settings.VOSK_MODEL_PATH, settings.STT_WORKERS)
+    return GoogleSpeechBackend()
+
+
+backend = _create_backend()
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    # Created lazily so it binds to the running event loop
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.STT_MAX_CONCURRENCY)
+    return _semaphore
+
+
+async def recognize_speech(audio_bytes: bytes) -> Optional[str]:
+    """
+    Recognizes speech from OGG/Opus audio bytes and returns the text.
+    """
+    try:
+        async with _get_semaphore():
+            with track_external("ffmpeg", "decode"):
+                pcm = await decode_to_pcm(audio_bytes, settings.STT_DECODE_TIMEOUT)
+
+            with track_external("stt", settings.STT_BACKEND):
+                return await asyncio.wait_for(backend.recognize(pcm), timeout=settings.STT_TIMEOUT)
+
+    except asyncio.TimeoutError:
+        print("Speech recognition timed out")
+        return None
+    except Exception as e:
+        print(f"Error processing audio: {e}")
+        return None
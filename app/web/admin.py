@@ -1,22 +1,109 @@
-from fastapi import APIRouter, Depends, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+import csv
+import io
+import json
+from typing import Optional
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, Depends, Request, Form, HTTPException
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_async_session
+from app.core.db import get_async_session, async_session_maker
 from app.services import crud
 from app.web.schemas import ServiceData, RawText
 from app.services.ai import get_service_data_from_text
-import asyncio
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 
 
+DASHBOARD_PAGE_SIZE = 50
+EXPORT_FIELDS = ["id", "name", "category", "address", "phone", "schedule", "social_media", "description", "latitude", "longitude"]
+
+
+def _dashboard_filters(category_id: Optional[int], q: Optional[str], missing_coordinates: bool) -> dict:
+    return {"category_id": category_id, "text": q, "missing_coordinates": missing_coordinates}
+
+
 @router.get("/", response_class=HTMLResponse)
-async def admin_dashboard(request: Request, session: AsyncSession = Depends(get_async_session)):
-    services = await crud.get_all_services(session)
-    return templates.TemplateResponse("admin/dashboard.html", {"request": request, "services": services})
+async def admin_dashboard(
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    # A string, since the filter form submits an empty value for "All categories"
+    category_id: Optional[str] = None,
+    q: Optional[str] = None,
+    missing_coordinates: bool = False,
+    after: Optional[int] = None,
+    before: Optional[int] = None,
+):
+    category_id = int(category_id) if category_id else None
+    filters = _dashboard_filters(category_id, q, missing_coordinates)
+    services, has_more = await crud.get_services_page(
+        session, DASHBOARD_PAGE_SIZE, after_id=after, before_id=before, **filters
+    )
+    # Paging backwards, "more" means there is a previous page; forwards, a next one
+    has_previous = has_more if before is not None else after is not None
+    has_next = has_more if before is None else True
+    categories = await crud.get_all_categories(session)
+    # Carried over into the paging and export links
+    params = {"category_id": category_id, "q": q, "missing_coordinates": "true" if missing_coordinates else None}
+    filter_query = urlencode({key: value for key, value in params.items() if value})
+    return templates.TemplateResponse("admin/dashboard.html", {
+        "request": request,
+        "services": services,
+        "categories": categories,
+        "filters": filters,
+        "filter_query": filter_query,
+        "previous_cursor": services[0].id if services and has_previous else None,
+        "next_cursor": services[-1].id if services and has_next else None,
+    })
+
+
+def _service_row(service) -> dict:
+    row = {field: getattr(service, field) for field in EXPORT_FIELDS if field != "category"}
+    row["category"] = service.category.name if service.category else None
+    return row
+
+
+@router.get("/export")
+async def export_services(
+    format: str = "csv",
+    category_id: Optional[int] = None,
+    q: Optional[str] = None,
+    missing_coordinates: bool = False,
+):
+    """
+    Streams the (optionally filtered) services as CSV or JSON Lines.
+    """
+    if format not in ("csv", "json"):
+        raise HTTPException(status_code=422, detail="format must be 'csv' or 'json'")
+    filters = _dashboard_filters(category_id, q, missing_coordinates)
+
+    async def rows():
+        # The session lives as long as the response body is being streamed
+        async with async_session_maker() as session:
+            if format == "csv":
+                buffer = io.StringIO()
+                writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+                writer.writeheader()
+                async for service in crud.stream_services(session, **filters):
+                    writer.writerow(_service_row(service))
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+                yield buffer.getvalue()
+            else:
+                async for service in crud.stream_services(session, **filters):
+                    yield json.dumps(_service_row(service), ensure_ascii=False) + "\n"
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = "services.csv" if format == "csv" else "services.jsonl"
+    return StreamingResponse(
+        rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.get("/add", response_class=HTMLResponse)
@@ -26,7 +113,7 @@ async def add_service_form(request: Request):
 
 @router.post("/process-text", response_class=JSONResponse)
 async def process_text_for_admin(raw_text: RawText):
-    service_data = await asyncio.to_thread(get_service_data_from_text, raw_text.text)
+    service_data = await get_service_data_from_text(raw_text.text)
     if not service_data:
         return JSONResponse(content={"error": "Failed to process text"}, status_code=500)
     return service_data.model_dump()
@@ -83,7 +170,7 @@ async def edit_service(
         social_media=social_media,
         description=description,
     )
-    await crud.update_service(session, service_id, service_data)
+    await crud.update_service(session, service_id, service_data.model_dump())
     return RedirectResponse(url="/admin", status_code=303)
 
 
@@ -1,15 +1,70 @@
-from fastapi import FastAPI, HTTPException, Depends
+import asyncio
+import io
+import json
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Depends, File, Form, Request, UploadFile
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.web.schemas import RawText, ServiceData
 from app.services.ai import get_service_data_from_text
 from app.services.crud import create_service
-from app.core.db import get_async_session
+from app.services.bulk_import import FORMATS, import_services, parse_records
+from app.core.db import async_session_maker, get_async_session
+from app.core.config import settings
+from app.core import metrics
 from app.web.admin import router as admin_router
+from app.services.geocoding_queue import geocoding_worker
+from app.services.embedding_queue import embedding_worker
+from app.services.extraction_jobs import extraction_jobs
+from app.bot import webhook
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Geocode services saved through the admin panel in the background
+    geocoding_worker.start()
+    # Embed them for semantic search too
+    if settings.SEMANTIC_SEARCH:
+        embedding_worker.start()
+    extraction_jobs.start()
+    if settings.BOT_WEBHOOK_URL:
+        await webhook.start_webhook()
+    yield
+    if settings.BOT_WEBHOOK_URL:
+        await webhook.stop_webhook()
+    await extraction_jobs.stop()
+    await embedding_worker.stop()
+    await geocoding_worker.stop()
+
 
-app = FastAPI(title="Snovsk Bot Admin Panel")
+app = FastAPI(title="Snovsk Bot Admin Panel", lifespan=lifespan)
 
 app.include_router(admin_router, prefix="/admin", tags=["admin"])
+if settings.BOT_WEBHOOK_URL:
+    app.include_router(webhook.router)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # The route template, not the raw path, to keep the label set small
+    route = request.scope.get("route")
+    metrics.HTTP_REQUEST_DURATION.labels(
+        request.method,
+        getattr(route, "path", "unmatched"),
+        response.status_code,
+    ).observe(time.perf_counter() - started)
+    return response
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    content, content_type = metrics.render()
+    return Response(content=content, media_type=content_type)
 
 
 @app.get("/")
@@ -21,11 +76,58 @@ async def process_text(raw_text: RawText):
     """
     Receives raw text, processes it with OpenAI, and returns structured data.
     """
-    service_data = get_service_data_from_text(raw_text.text)
+    service_data = await get_service_data_from_text(raw_text.text)
     if not service_data:
         raise HTTPException(status_code=500, detail="Failed to process text with AI")
     return service_data
 
+# Seconds between SSE keep-alive comments while a job is still running
+JOB_EVENTS_HEARTBEAT = 15
+
+@app.post("/process-text/jobs", status_code=202)
+async def submit_process_text_job(raw_text: RawText):
+    """
+    Queues raw text for AI extraction and returns the job id without waiting for the result.
+    """
+    job = extraction_jobs.submit(raw_text.text)
+    if job is None:
+        raise HTTPException(status_code=503, detail="Too many extraction jobs queued, try again later")
+    return {"job_id": job.id, "status": job.status}
+
+@app.get("/process-text/jobs/{job_id}")
+async def get_process_text_job(job_id: str):
+    """
+    Returns the status of an extraction job and, once it is done, the structured data.
+    """
+    job = extraction_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.as_dict()
+
+@app.get("/process-text/jobs/{job_id}/events")
+async def stream_process_text_job(job_id: str):
+    """
+    Streams the status changes of an extraction job as server-sent events, ending with the result.
+    """
+    job = extraction_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        while True:
+            # Taken before reporting the status, so a change right after it is not missed
+            changed = job.changed
+            yield f"event: {job.status}\ndata: {json.dumps(job.as_dict(), ensure_ascii=False)}\n\n"
+            if job.finished:
+                return
+            while not changed.is_set():
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=JOB_EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.post("/services/", response_model=ServiceData)
 async def add_service(
     service_data: ServiceData,
@@ -35,4 +137,51 @@ async def add_service(
     Adds a new service to the database.
     """
     service = await create_service(session, service_data.model_dump())
-    return service
\ No newline at end of file
+    return service
+
+@app.post("/services/import", status_code=202)
+async def bulk_import_services(
+    format: str = Form(...),
+    file: UploadFile = File(None),
+    text: str = Form(None),
+):
+    """
+    Queues a bulk import of services from an uploaded CSV/JSONL file or pasted raw listings
+    and returns the job id. The import report is the result of the job.
+    """
+    if format not in FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of {FORMATS}")
+    if file is not None:
+        # The upload is read before the request ends, decoding a large one off the event loop
+        content = await file.read()
+        try:
+            text = await asyncio.to_thread(content.decode, "utf-8")
+        except UnicodeDecodeError as e:
+            raise HTTPException(status_code=422, detail=f"File is not valid UTF-8: {e}")
+    elif not text:
+        raise HTTPException(status_code=422, detail="Either file or text is required")
+
+    async def run() -> dict:
+        async with async_session_maker() as session:
+            report = await import_services(
+                session,
+                parse_records(io.StringIO(text, newline=""), format),
+                settings.BULK_IMPORT_CONCURRENCY,
+                settings.BULK_IMPORT_CHUNK_SIZE,
+            )
+        return report.as_dict()
+
+    job = extraction_jobs.submit_task(run)
+    if job is None:
+        raise HTTPException(status_code=503, detail="Too many jobs queued, try again later")
+    return {"job_id": job.id, "status": job.status}
+
+@app.get("/services/import/jobs/{job_id}")
+async def get_bulk_import_job(job_id: str):
+    """
+    Returns the status of a bulk import job and, once it is done, the import report.
+    """
+    job = extraction_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.as_dict()
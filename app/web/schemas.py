@@ -21,4 +21,9 @@ class ServiceData(BaseModel):
     description: Optional[str] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class SearchQuery(BaseModel):
+    language: str
+    text: str
+    keywords: list[str]
@@ -0,0 +1,13 @@
+"""
+Offline load tests for the bot and the admin panel.
+
+Telegram, OpenAI, speech recognition and the Google geocoder are replaced by local fakes
+with configurable latency, so runs are reproducible and cost nothing. The database is real:
+point DATABASE_URL at a scratch PostgreSQL database migrated with `alembic upgrade head`.
+
+    python -m benchmarks.seed --services 5000
+    python -m benchmarks.run --scenarios search,category,voice,admin --concurrency 32 --requests 2000
+    python -m benchmarks.seed --clear
+
+Run from the repository root, so the admin templates are found.
+"""
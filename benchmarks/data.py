@@ -0,0 +1,47 @@
+"""
+Deterministic synthetic data shared by the seeder, the fakes and the update generator.
+"""
+import random
+
+# Seeded services are named with this prefix so `benchmarks.seed --clear` can remove them
+NAME_PREFIX = "bench"
+
+CATEGORIES = {
+    "Послуги краси": ["перукарня", "манікюр", "стрижка", "косметолог", "барбершоп"],
+    "Автомобільний сервіс": ["шиномонтаж", "автомийка", "ремонт коліс", "СТО", "автоелектрик"],
+    "Ремонт та обслуговування": ["сантехнік", "електрик", "ремонт техніки", "ремонт взуття", "ключі"],
+    "Розклад транспорту": ["автобус", "маршрутка", "таксі", "вокзал", "перевезення"],
+}
+KEYWORDS = [keyword for keywords in CATEGORIES.values() for keyword in keywords]
+STREETS = ["Центральна", "Шевченка", "Миру", "Вокзальна", "Садова", "Незалежності"]
+
+# Short Ukrainian queries are searched as is; conversational ones go through the (fake) LLM
+PLAIN_QUERIES = ["стрижка", "шиномонтаж", "сантехнік", "автомийка", "манікюр", "таксі"]
+CONVERSATIONAL_QUERIES = [
+    "де можна підстригтися недорого",
+    "підкажіть хто ремонтує колеса",
+    "потрібен електрик на завтра",
+    "где помыть машину",
+    "коли їде автобус до Чернігова",
+]
+
+
+def service_records(count: int, seed: int = 42) -> list[dict]:
+    """
+    Builds `count` services spread over the categories, ready for bulk_import.import_services.
+    """
+    rng = random.Random(seed)
+    records = []
+    for number in range(count):
+        category = rng.choice(list(CATEGORIES))
+        keyword = rng.choice(CATEGORIES[category])
+        records.append({
+            "name": f"{NAME_PREFIX} {keyword} {number}",
+            "category": category,
+            "address": f"вул. {rng.choice(STREETS)}, {rng.randint(1, 120)}",
+            "phone": f"099{rng.randint(1000000, 9999999)}",
+            "schedule": "Пн-Пт 9:00-18:00",
+            "social_media": None,
+            "description": f"{keyword.capitalize()} у Сновську. {rng.choice(KEYWORDS)}, {rng.choice(KEYWORDS)}.",
+        })
+    return records
@@ -0,0 +1,244 @@
+"""
+Local stand-ins for the external services the bot talks to.
+
+- FakeOpenAIServer:     an HTTP server speaking enough of the Chat Completions (plain and
+                        streamed) and Embeddings APIs for app.services.ai; point
+                        OPENAI_BASE_URL at it
+- FakeTelegramSession:  an aiogram session that answers Bot API calls locally
+- FakeSpeechBackend:    replaces app.services.speech.backend
+- FakeGeocoder:         replaces app.services.maps._google_geocode
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import subprocess
+import threading
+import time
+from typing import Any, AsyncGenerator, Dict, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import EditMessageText, GetFile, SendLocation, SendMessage, TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiohttp import web
+
+from benchmarks.data import CATEGORIES, KEYWORDS, PLAIN_QUERIES
+
+
+def _pick(text: str, options: list) -> Any:
+    # Deterministic, so the same prompt always gets the same answer
+    digest = hashlib.sha1(text.encode()).digest()
+    return options[digest[0] % len(options)]
+
+
+class FakeOpenAIServer:
+    """
+    Answers chat completions after `latency` seconds. Streamed answers then arrive in
+    chunks of `chunk_size` characters, `chunk_delay` seconds apart.
+
+    Runs its own event loop in a thread, so it does not compete with the code under test.
+    """
+
+    def __init__(self, latency: float, chunk_delay: float = 0.02, chunk_size: int = 16, port: int = 0):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunk_size = chunk_size
+        self.port = port
+        self.requests = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def _content(self, messages: list[dict]) -> str:
+        system, prompt = messages[0]["content"], messages[-1]["content"]
+        if "normalizes user queries" in system:
+            keywords = [_pick(prompt, KEYWORDS), _pick(prompt[::-1], KEYWORDS)]
+            return json.dumps({"language": "uk", "text": " ".join(keywords), "keywords": keywords}, ensure_ascii=False)
+        category = _pick(prompt, list(CATEGORIES))
+        return json.dumps({
+            "name": f"Нова послуга {_pick(prompt, CATEGORIES[category])}",
+            "category": category,
+            "address": "вул. Центральна, 1",
+            "phone": "0991234567",
+            "schedule": "Пн-Сб 9:00-18:00",
+            "social_media": None,
+            "description": "Послуга, додана під час навантажувального тесту.",
+        }, ensure_ascii=False)
+
+    async def _chat_completions(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        body = await request.json()
+        content = self._content(body["messages"])
+        base = {"id": "chatcmpl-bench", "created": int(time.time()), "model": body["model"]}
+        await asyncio.sleep(self.latency)
+
+        if not body.get("stream"):
+            return web.json_response({
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for start in range(0, len(content), self.chunk_size):
+            chunk = {
+                **base,
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {"content": content[start:start + self.chunk_size]}, "finish_reason": None}],
+            }
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+            await asyncio.sleep(self.chunk_delay)
+        final = {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        await response.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+        await response.write_eof()
+        return response
+
+    async def _embeddings(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        body = await request.json()
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dimensions = body.get("dimensions") or 256
+        await asyncio.sleep(self.latency)
+        data = []
+        for index, text in enumerate(texts):
+            # Seeded by the text, so equal texts get equal vectors
+            rng = random.Random(hashlib.sha1(text.encode()).digest())
+            data.append({"object": "embedding", "index": index, "embedding": [rng.gauss(0, 1) for _ in range(dimensions)]})
+        return web.json_response({
+            "object": "list",
+            "data": data,
+            "model": body["model"],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        })
+
+    async def _start(self) -> None:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._chat_completions)
+        app.router.add_post("/v1/embeddings", self._embeddings)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    def start(self) -> None:
+        """
+        Starts the server in a background thread and returns once it accepts connections.
+        """
+        started = threading.Event()
+
+        def run() -> None:
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self._start())
+            started.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        started.wait()
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            future = asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop)
+            future.result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+class FakeTelegramSession(BaseSession):
+    """
+    Answers Bot API requests locally after `latency` seconds and counts them by method.
+    Voice downloads return `voice_sample`.
+    """
+
+    def __init__(self, latency: float, voice_sample: bytes = b""):
+        super().__init__()
+        self.latency = latency
+        self.voice_sample = voice_sample
+        self.calls: dict[str, int] = {}
+        self._message_ids = itertools.count(1)
+
+    def _result(self, method: TelegramMethod) -> Any:
+        if isinstance(method, (SendMessage, EditMessageText, SendLocation)):
+            return {
+                "message_id": method.message_id if isinstance(method, EditMessageText) else next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": method.chat_id, "type": "private"},
+                "text": getattr(method, "text", None),
+            }
+        if isinstance(method, GetFile):
+            return {"file_id": method.file_id, "file_unique_id": method.file_id, "file_path": "voice/bench.oga"}
+        return True
+
+    async def make_request(self, bot: Bot, method: TelegramMethod[TelegramType], timeout: Optional[int] = None) -> TelegramType:
+        name = method.__api_method__
+        self.calls[name] = self.calls.get(name, 0) + 1
+        await asyncio.sleep(self.latency)
+        # Parsed like a real response, so returned objects are bound to the bot
+        response = Response[method.__returning__].model_validate(
+            {"ok": True, "result": self._result(method)}, context={"bot": bot}
+        )
+        return response.result
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: Optional[Dict[str, Any]] = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        await asyncio.sleep(self.latency)
+        yield self.voice_sample
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeSpeechBackend:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def recognize(self, pcm: bytes) -> Optional[str]:
+        await asyncio.sleep(self.latency)
+        return _pick(str(len(pcm)), PLAIN_QUERIES)
+
+
+class FakeGeocoder:
+    """
+    Returns coordinates around Snovsk. Blocking, like the googlemaps client it replaces.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, address: str) -> Optional[tuple[float, float]]:
+        self.calls += 1
+        time.sleep(self.latency)
+        digest = hashlib.sha1(address.encode()).digest()
+        return 51.82 + digest[0] / 25500, 31.95 + digest[1] / 25500
+
+
+def make_voice_sample(seconds: float = 2.0) -> Optional[bytes]:
+    """
+    Encodes a short tone as OGG/Opus, like a Telegram voice note. Returns None without ffmpeg.
+    """
+    try:
+        result = subprocess.run(
+            [
+                "ffmpeg", "-hide_banner", "-loglevel", "error",
+                "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+                "-c:a", "libopus", "-f", "ogg", "pipe:1",
+            ],
+            capture_output=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout
@@ -0,0 +1,196 @@
+"""
+Drives the bot and the admin panel with synthetic traffic and reports throughput and latency.
+
+Bot scenarios feed synthetic updates through the Dispatcher built by app.bot.main, so routing,
+middlewares, handlers, the database and (fake) external calls are all on the measured path.
+Admin requests go through the FastAPI app in process.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from benchmarks.fakes import FakeGeocoder, FakeOpenAIServer, FakeSpeechBackend, FakeTelegramSession, make_voice_sample
+
+SCENARIOS = ("search", "category", "voice", "admin")
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def percentile(self, q: float) -> float:
+        # Nearest rank
+        ordered = sorted(self.latencies)
+        return ordered[max(0, int(round(q * len(ordered))) - 1)] if ordered else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "scenario": self.name,
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "throughput": len(self.latencies) / self.elapsed if self.elapsed else 0.0,
+            "p50_ms": self.percentile(0.50) * 1000,
+            "p95_ms": self.percentile(0.95) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "max_ms": max(self.latencies, default=0.0) * 1000,
+        }
+
+
+async def run_scenario(name: str, make_call: Callable[[], Awaitable], requests: int, concurrency: int) -> ScenarioResult:
+    """
+    Runs `requests` calls with at most `concurrency` in flight and records each call's latency.
+    """
+    result = ScenarioResult(name)
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            call = make_call()
+            started = time.perf_counter()
+            try:
+                await call
+            except Exception as e:
+                result.errors += 1
+                print(f"[{name}] {type(e).__name__}: {e}")
+            result.latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def print_report(results: list[ScenarioResult]) -> None:
+    header = f"{'scenario':<10} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        row = result.as_dict()
+        print(
+            f"{row['scenario']:<10} {row['requests']:>8} {row['errors']:>6} {row['throughput']:>8.1f} "
+            f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}"
+        )
+
+
+async def main(args: argparse.Namespace) -> None:
+    openai_server = FakeOpenAIServer(args.openai_latency, chunk_delay=args.openai_chunk_delay)
+    openai_server.start()
+
+    # Settings are read when app modules are imported, so configure them first
+    os.environ["OPENAI_BASE_URL"] = openai_server.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ.setdefault("BOT_TOKEN", "123456:bench")
+    os.environ["REDIS_URL"] = ""
+    if not args.throttling:
+        for name in ("THROTTLE_USER_RATE", "THROTTLE_USER_BURST", "THROTTLE_GLOBAL_RATE", "THROTTLE_GLOBAL_BURST", "THROTTLE_MAX_IN_FLIGHT"):
+            os.environ[name] = "1000000"
+
+    import httpx
+
+    from app.bot.main import create_bot, create_dispatcher
+    from app.core.db import async_session_maker
+    from app.services import maps, speech
+    from app.services.category_registry import category_registry
+    from app.services.geocoding_queue import geocoding_worker
+    from app.web.main import app
+    from benchmarks.updates import UpdateFactory
+
+    voice_sample = make_voice_sample() if "voice" in args.scenarios else None
+    if "voice" in args.scenarios and voice_sample is None:
+        print("Skipping the voice scenario: ffmpeg with libopus is needed to build a sample")
+        args.scenarios.remove("voice")
+
+    speech.backend = FakeSpeechBackend(args.stt_latency)
+    geocoder = FakeGeocoder(args.geocode_latency)
+    maps._google_geocode = geocoder
+
+    session = FakeTelegramSession(args.telegram_latency, voice_sample or b"")
+    bot = create_bot(session)
+    dp = create_dispatcher()
+
+    async with async_session_maker() as db_session:
+        category_ids = await category_registry.get_all(db_session)
+    updates = UpdateFactory(category_ids, args.users, args.seed)
+    rng = random.Random(args.seed)
+
+    admin = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://admin")
+    category_id_list = list(category_ids.values())
+
+    async def admin_call() -> None:
+        roll = rng.random()
+        if roll < 0.5:
+            response = await admin.get("/admin/")
+        elif roll < 0.8:
+            response = await admin.get("/admin/", params={"category_id": rng.choice(category_id_list), "q": "bench"})
+        elif roll < 0.95:
+            response = await admin.post("/process-text/", json={"text": "Шиномонтаж біля вокзалу, телефон 0991234567"})
+        else:
+            # Writes also exercise the background geocoder
+            response = await admin.post("/services/", json={
+                "name": f"bench admin {rng.randrange(10 ** 9)}",
+                "category": "Автомобільний сервіс",
+                "address": f"вул. Вокзальна, {rng.randint(1, 120)}",
+            })
+        response.raise_for_status()
+
+    calls = {
+        "search": lambda: dp.feed_update(bot, updates.search(args.conversational_share)),
+        "category": lambda: dp.feed_update(bot, updates.category()),
+        "voice": lambda: dp.feed_update(bot, updates.voice()),
+        "admin": admin_call,
+    }
+
+    geocoding_worker.start()
+    results = []
+    try:
+        for name in args.scenarios:
+            if args.warmup:
+                await run_scenario(name, calls[name], args.warmup, args.concurrency)
+            results.append(await run_scenario(name, calls[name], args.requests, args.concurrency))
+    finally:
+        await geocoding_worker.stop()
+        await admin.aclose()
+        openai_server.stop()
+
+    print_report(results)
+    print(f"\nOpenAI requests: {openai_server.requests}, geocoder calls: {geocoder.calls}")
+    print(f"Telegram calls: {dict(sorted(session.calls.items()))}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump({"args": vars(args), "results": [result.as_dict() for result in results]}, output, indent=2)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline load test of the bot and admin panel hot paths.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma separated, from {SCENARIOS}")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per scenario, to fill caches and pools")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=1000, help="simulated Telegram users")
+    parser.add_argument("--conversational-share", type=float, default=0.5, help="share of searches that need the LLM")
+    parser.add_argument("--openai-latency", type=float, default=0.8, help="seconds to the first byte of a completion")
+    parser.add_argument("--openai-chunk-delay", type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument("--telegram-latency", type=float, default=0.05)
+    parser.add_argument("--stt-latency", type=float, default=0.5)
+    parser.add_argument("--geocode-latency", type=float, default=0.1)
+    parser.add_argument("--throttling", action="store_true", help="keep the configured per-user and global rate limits")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write the results as JSON, for comparing runs")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,36 @@
+import argparse
+import asyncio
+
+from sqlalchemy import delete
+
+from app.core.config import settings
+from app.core.db import async_session_maker
+from app.models import Service
+from app.services.bulk_import import import_services
+from benchmarks.data import NAME_PREFIX, service_records
+
+async def main():
+    parser = argparse.ArgumentParser(description="Seed (or remove) synthetic services for the benchmarks.")
+    parser.add_argument("--services", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42, help="random seed, for reproducible data")
+    parser.add_argument("--clear", action="store_true", help="delete the seeded services instead")
+    args = parser.parse_args()
+
+    async with async_session_maker() as session:
+        if args.clear:
+            result = await session.execute(delete(Service).where(Service.name.like(f"{NAME_PREFIX} %")))
+            await session.commit()
+            print(f"Deleted {result.rowcount} services")
+            return
+
+        # Structured records skip AI extraction, so seeding needs no OpenAI access
+        report = await import_services(
+            session,
+            service_records(args.services, args.seed),
+            settings.BULK_IMPORT_CONCURRENCY,
+            settings.BULK_IMPORT_CHUNK_SIZE,
+        )
+    print(report.as_dict())
+
+if __name__ == "__main__":
+    asyncio.run(main())
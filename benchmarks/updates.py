@@ -0,0 +1,70 @@
+"""
+Synthetic Telegram updates for feeding the Dispatcher directly.
+"""
+import itertools
+import random
+from datetime import datetime, timezone
+
+from aiogram.types import CallbackQuery, Chat, Message, Update, User, Voice
+
+from app.bot.keyboards.callbacks import PaginationCallback
+from benchmarks.data import CATEGORIES, CONVERSATIONAL_QUERIES, PLAIN_QUERIES
+
+CATEGORY_BUTTONS = ["💅 Послуги краси", "🚗 Автомобільний сервіс", "🏠 Ремонт та обслуговування", "🚌 Розклад транспорту"]
+
+
+class UpdateFactory:
+    """
+    Builds updates from a pool of `users` simulated users. Every update is from a random user,
+    so per-user state (FSM, throttling) behaves like real traffic.
+    """
+
+    def __init__(self, category_ids: dict[str, int], users: int, seed: int = 42):
+        self.category_ids = [category_ids[name] for name in CATEGORIES if name in category_ids]
+        self.users = users
+        self.rng = random.Random(seed)
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    def _message(self, user_id: int, **fields) -> Message:
+        return Message(
+            message_id=next(self._message_ids),
+            date=datetime.now(timezone.utc),
+            chat=Chat(id=user_id, type="private"),
+            from_user=User(id=user_id, is_bot=False, first_name="Bench"),
+            **fields,
+        )
+
+    def _user(self) -> int:
+        return 1_000_000 + self.rng.randrange(self.users)
+
+    def text(self, text: str) -> Update:
+        return Update(update_id=next(self._update_ids), message=self._message(self._user(), text=text))
+
+    def callback(self, data: str) -> Update:
+        user_id = self._user()
+        return Update(
+            update_id=next(self._update_ids),
+            callback_query=CallbackQuery(
+                id=str(next(self._update_ids)),
+                from_user=User(id=user_id, is_bot=False, first_name="Bench"),
+                chat_instance=str(user_id),
+                message=self._message(user_id, text="..."),
+                data=data,
+            ),
+        )
+
+    def voice(self) -> Update:
+        voice = Voice(file_id="bench-voice", file_unique_id="bench-voice", duration=2)
+        return Update(update_id=next(self._update_ids), message=self._message(self._user(), voice=voice))
+
+    def search(self, conversational_share: float) -> Update:
+        queries = CONVERSATIONAL_QUERIES if self.rng.random() < conversational_share else PLAIN_QUERIES
+        return self.text(self.rng.choice(queries))
+
+    def category(self) -> Update:
+        # Mostly page flips, which is what users do most in a category
+        if not self.category_ids or self.rng.random() < 0.25:
+            return self.text(self.rng.choice(CATEGORY_BUTTONS))
+        page = self.rng.randint(1, 20)
+        return self.callback(PaginationCallback(action="next", page=page, category_id=self.rng.choice(self.category_ids)).pack())
@@ -0,0 +1,29 @@
+"""Add category_id index to services
+
+Revision ID: 9c1e4b7a2d30
+Revises: 31a61800faed
+Create Date: 2025-07-14 10:12:40.512306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1e4b7a2d30'
+down_revision: Union[str, Sequence[str], None] = '31a61800faed'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Backs the paginated category listing: filter by category, order by id
+    op.create_index('ix_services_category_id_id', 'services', ['category_id', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_services_category_id_id', table_name='services')
@@ -0,0 +1,35 @@
+"""Add earthdistance index to services
+
+Revision ID: a6e9d1b35c72
+Revises: f2a7c4e91b08
+Create Date: 2025-08-02 09:58:31.275614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6e9d1b35c72'
+down_revision: Union[str, Sequence[str], None] = 'f2a7c4e91b08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS cube")
+    op.execute("CREATE EXTENSION IF NOT EXISTS earthdistance")
+    # GiST on the earth point supports KNN ordering with the cube `<->` operator
+    op.create_index(
+        'ix_services_earth', 'services', [sa.text('ll_to_earth(latitude, longitude)')],
+        postgresql_using='gist',
+        postgresql_where=sa.text('latitude IS NOT NULL AND longitude IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_services_earth', table_name='services')
@@ -0,0 +1,47 @@
+"""Add full-text and trigram search to services
+
+Revision ID: b4d82f6e1a97
+Revises: 9c1e4b7a2d30
+Create Date: 2025-07-15 18:03:11.204587
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d82f6e1a97'
+down_revision: Union[str, Sequence[str], None] = '9c1e4b7a2d30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(address, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        'services',
+        sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR_EXPRESSION, persisted=True), nullable=True),
+    )
+    op.create_index('ix_services_search_vector', 'services', ['search_vector'], postgresql_using='gin')
+    op.create_index('ix_services_name_trgm', 'services', ['name'], postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_services_description_trgm', 'services', ['description'], postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'})
+    op.create_index('ix_services_address_trgm', 'services', ['address'], postgresql_using='gin', postgresql_ops={'address': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_services_address_trgm', table_name='services')
+    op.drop_index('ix_services_description_trgm', table_name='services')
+    op.drop_index('ix_services_name_trgm', table_name='services')
+    op.drop_index('ix_services_search_vector', table_name='services')
+    op.drop_column('services', 'search_vector')
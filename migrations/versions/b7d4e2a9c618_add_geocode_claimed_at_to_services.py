@@ -0,0 +1,28 @@
+"""Add geocode_claimed_at to services
+
+Revision ID: b7d4e2a9c618
+Revises: e3f9b6c0d217
+Create Date: 2025-08-06 11:42:17.503921
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d4e2a9c618'
+down_revision: Union[str, Sequence[str], None] = 'e3f9b6c0d217'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('services', sa.Column('geocode_claimed_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('services', 'geocode_claimed_at')
@@ -0,0 +1,31 @@
+"""Add updated_at to services
+
+Revision ID: c5d8a2f1b934
+Revises: a6e9d1b35c72
+Create Date: 2025-08-03 11:12:47.518302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d8a2f1b934'
+down_revision: Union[str, Sequence[str], None] = 'a6e9d1b35c72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'services',
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('services', 'updated_at')
@@ -0,0 +1,35 @@
+"""Add geocode cache table
+
+Revision ID: d31a5c9e8f42
+Revises: b4d82f6e1a97
+Create Date: 2025-07-18 11:47:05.930114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd31a5c9e8f42'
+down_revision: Union[str, Sequence[str], None] = 'b4d82f6e1a97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('geocode_cache',
+    sa.Column('address', sa.String(length=255), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('source', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('address')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('geocode_cache')
@@ -0,0 +1,37 @@
+"""Add service_embeddings table
+
+Revision ID: e3f9b6c0d217
+Revises: c5d8a2f1b934
+Create Date: 2025-08-04 14:26:09.731845
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3f9b6c0d217'
+down_revision: Union[str, Sequence[str], None] = 'c5d8a2f1b934'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'service_embeddings',
+        sa.Column('service_id', sa.Integer(), nullable=False),
+        sa.Column('model', sa.String(length=100), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('embedding', sa.LargeBinary(), nullable=False),
+        sa.Column('service_updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['service_id'], ['services.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('service_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('service_embeddings')
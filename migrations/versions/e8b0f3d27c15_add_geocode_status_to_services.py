@@ -0,0 +1,34 @@
+"""Add geocode_status to services
+
+Revision ID: e8b0f3d27c15
+Revises: d31a5c9e8f42
+Create Date: 2025-07-21 16:25:52.148730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b0f3d27c15'
+down_revision: Union[str, Sequence[str], None] = 'd31a5c9e8f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('services', sa.Column('geocode_status', sa.String(length=20), nullable=True))
+    op.execute("UPDATE services SET geocode_status = 'done' WHERE latitude IS NOT NULL AND longitude IS NOT NULL")
+    op.create_index(
+        'ix_services_geocode_pending', 'services', ['id'],
+        postgresql_where=sa.text("geocode_status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_services_geocode_pending', table_name='services')
+    op.drop_column('services', 'geocode_status')
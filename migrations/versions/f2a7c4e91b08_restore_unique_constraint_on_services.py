@@ -0,0 +1,32 @@
+"""Restore unique constraint on services
+
+Revision ID: f2a7c4e91b08
+Revises: e8b0f3d27c15
+Create Date: 2025-07-27 13:40:18.662904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a7c4e91b08'
+down_revision: Union[str, Sequence[str], None] = 'e8b0f3d27c15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Autogenerate dropped this constraint in f7f5621b5687 because the model did not declare it.
+    # Bulk imports upsert on it. Duplicate (name, category_id) rows must be merged before upgrading.
+    op.create_unique_constraint(
+        "uq_service_name_category", "services", ["name", "category_id"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("uq_service_name_category", "services", type_="unique")
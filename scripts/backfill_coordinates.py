@@ -0,0 +1,39 @@
+import argparse
+import asyncio
+
+from sqlalchemy import update
+from app.core.db import async_session_maker
+from app.models import Service
+from app.models.service import GEOCODE_PENDING, GEOCODE_FAILED
+from app.services.geocoding_queue import geocoding_worker
+from app.services.maps import forget_misses
+
+async def backfill_coordinates(retry_failed: bool):
+    async with async_session_maker() as session:
+        condition = Service.latitude.is_(None) & Service.address.isnot(None) & (Service.address != "")
+        if retry_failed:
+            condition &= Service.geocode_status.is_distinct_from(GEOCODE_PENDING)
+        else:
+            condition &= Service.geocode_status.is_(None)
+        result = await session.execute(
+            update(Service).where(condition).values(geocode_status=GEOCODE_PENDING).returning(Service.address)
+        )
+        addresses = result.scalars().all()
+        if retry_failed:
+            # Otherwise the cached "not found" results would fail them again without asking Google
+            forgotten = await forget_misses(session, addresses)
+            print(f"Dropped {forgotten} cached geocoding misses")
+        await session.commit()
+        print(f"Queued {len(addresses)} services for geocoding")
+
+    geocoded = await geocoding_worker.drain()
+    print(f"Processed {geocoded} services")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Geocode existing services that have no coordinates.")
+    parser.add_argument("--retry-failed", action="store_true", help=f"also retry services marked as '{GEOCODE_FAILED}'")
+    args = parser.parse_args()
+    await backfill_coordinates(args.retry_failed)
+
+if __name__ == "__main__":
+    asyncio.run(main())
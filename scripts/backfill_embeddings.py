@@ -0,0 +1,11 @@
+import asyncio
+
+from app.services.embedding_queue import embedding_worker
+
+async def main():
+    # Embeds every service that has no embedding for the configured model, or changed since
+    processed = await embedding_worker.drain()
+    print(f"Processed {processed} services")
+
+if __name__ == "__main__":
+    asyncio.run(main())
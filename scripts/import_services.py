@@ -0,0 +1,29 @@
+import argparse
+import asyncio
+import sys
+
+from app.core.config import settings
+from app.core.db import async_session_maker
+from app.services.bulk_import import FORMATS, import_services, parse_records
+
+async def main():
+    parser = argparse.ArgumentParser(description="Bulk import services from CSV, JSONL or raw listings.")
+    parser.add_argument("path", help="input file, or '-' for stdin")
+    parser.add_argument("--format", choices=FORMATS, required=True)
+    parser.add_argument("--concurrency", type=int, default=settings.BULK_IMPORT_CONCURRENCY, help="parallel AI extractions")
+    parser.add_argument("--chunk-size", type=int, default=settings.BULK_IMPORT_CHUNK_SIZE, help="services per transaction")
+    args = parser.parse_args()
+
+    lines = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8", newline="")
+    try:
+        async with async_session_maker() as session:
+            report = await import_services(
+                session, parse_records(lines, args.format), args.concurrency, args.chunk_size
+            )
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+    print(report.as_dict())
+
+if __name__ == "__main__":
+    asyncio.run(main())